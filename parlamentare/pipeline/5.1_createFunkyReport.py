@@ -1,9 +1,30 @@
 import os
 import re
 import json
-from typing import Optional, Tuple, Dict
+import time
+from typing import Optional, Tuple, Dict, List
 import pandas as pd
 
+from tools.ads_index import AdsMetadataIndex
+from tools.verdict_record import VerdictRecord
+
+# Constants
+EXCEL_WRITER = 'streaming'  # 'streaming' (write-only openpyxl) or 'pandas'
+EXTRA_OUTPUT_FORMATS = []  # Any of 'csv', 'parquet'
+COMPARE_WRITERS = False  # Also time the other Excel writer and log both timings
+MAX_COLUMN_WIDTH = 100
+
+COLUMNS_ORDER = [
+    "page name",
+    "page link",
+    "ads link",
+    "ad spend",
+    "ad impressions",
+    "ad start date",
+    "ad end date",
+    "summary"
+]
+
 
 def extract_complaint_info(json_content: Dict) -> Optional[Tuple[str, str, str]]:
     """Extract entity, violation and ad_archive_id from the JSON response"""
@@ -39,24 +60,115 @@ def parse_complaint(message: str) -> Tuple[str, str]:
     return "", message
 
 
-def create_excel_report(input_dir: str, output_dir: str, fb_ads_file: str):
-    """Create Excel report from JSON files and Facebook Ads data"""
+def compute_column_widths(df: pd.DataFrame) -> List[int]:
+    """Compute Excel column widths from the longest value (or header) of each column"""
+    lengths = df.astype(str).apply(lambda column: column.str.len().max())
+    return [
+        min(max(int(length) if pd.notna(length) else 0, len(col)) + 2, MAX_COLUMN_WIDTH)
+        for col, length in zip(df.columns, lengths)
+    ]
+
+
+def write_excel_pandas(df: pd.DataFrame, output_file: str):
+    """Write the report through pandas.ExcelWriter (keeps the whole workbook in memory)"""
+    from openpyxl.utils import get_column_letter
+
+    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Report')
+
+        worksheet = writer.sheets['Report']
+        for idx, width in enumerate(compute_column_widths(df), start=1):
+            worksheet.column_dimensions[get_column_letter(idx)].width = width
+
+
+def write_excel_streaming(df: pd.DataFrame, output_file: str):
+    """Write the report with a write-only openpyxl workbook, streaming rows in constant memory"""
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Report')
+
+    # Column widths must be set before the first row is streamed
+    for idx, width in enumerate(compute_column_widths(df), start=1):
+        worksheet.column_dimensions[get_column_letter(idx)].width = width
+
+    worksheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        worksheet.append(row)
+
+    workbook.save(output_file)
+
+
+EXCEL_WRITERS = {
+    'streaming': write_excel_streaming,
+    'pandas': write_excel_pandas,
+}
+
+
+def write_extra_outputs(df: pd.DataFrame, output_dir: str, formats: List[str]):
+    """Write the report in additional formats next to the Excel file"""
+    for fmt in formats:
+        output_file = os.path.join(output_dir, f'funky_report.{fmt}')
+        started = time.perf_counter()
+        try:
+            if fmt == 'csv':
+                df.to_csv(output_file, index=False, encoding='utf-8')
+            elif fmt == 'parquet':
+                df.to_parquet(output_file, index=False)
+            else:
+                print(f"Unknown output format '{fmt}', skipping")
+                continue
+        except Exception as e:
+            print(f"Error writing {fmt} report: {str(e)}")
+            continue
+        print(f"Report generated: {output_file} ({time.perf_counter() - started:.2f}s)")
+
+
+def write_report(df: pd.DataFrame, output_dir: str, writer: str = EXCEL_WRITER,
+                 extra_formats: List[str] = None, compare_writers: bool = COMPARE_WRITERS):
+    """Write the Excel report (plus optional extra formats), logging how long each writer took"""
+    output_file = os.path.join(output_dir, 'funky_report.xlsx')
+
+    started = time.perf_counter()
+    EXCEL_WRITERS[writer](df, output_file)
+    elapsed = time.perf_counter() - started
+    print(f"Report generated: {output_file} ({writer} writer, {len(df)} rows, {elapsed:.2f}s)")
+
+    if compare_writers:
+        for other, write in EXCEL_WRITERS.items():
+            if other == writer:
+                continue
+            comparison_file = os.path.join(output_dir, f'funky_report.{other}.xlsx')
+            other_started = time.perf_counter()
+            write(df, comparison_file)
+            other_elapsed = time.perf_counter() - other_started
+            os.remove(comparison_file)
+            print(f"Writer comparison: {writer} {elapsed:.2f}s vs {other} {other_elapsed:.2f}s "
+                  f"({other_elapsed / elapsed if elapsed else float('inf'):.1f}x)")
+
+    write_extra_outputs(df, output_dir, extra_formats if extra_formats is not None else EXTRA_OUTPUT_FORMATS)
+
+
+def create_excel_report(input_dir: str, output_dir: str, results_dir: str):
+    """Create Excel report from JSON files and the indexed Facebook Ads data"""
     if not os.path.exists(input_dir):
         print(f"Error: Input directory '{input_dir}' does not exist!")
         return
 
-    # Load Facebook Ads data
+    # Keep the ads index in sync with every results snapshot
+    ads_index = None
     try:
-        with open(fb_ads_file, 'r', encoding='utf-8') as f:
-            fb_ads_data = json.load(f)
-            # Create a lookup dictionary by ad_archive_id
-            ads_lookup = {ad['ad_archive_id']: ad for ad in fb_ads_data.get('ads', [])}
+        ads_index = AdsMetadataIndex(os.path.join(results_dir, 'ads_index.sqlite'))
+        ads_index.refresh(results_dir)
     except Exception as e:
         print(f"Error loading Facebook Ads data: {str(e)}")
+        if ads_index is not None:
+            ads_index.close()
         return
 
-    # Initialize lists to store data
-    report_data = []
+    # Collect violations first, so only the ads that need it are looked up
+    violations = []
 
     # Process all JSON files
     json_files = [f for f in os.listdir(input_dir) if f.endswith('.json')]
@@ -77,63 +189,53 @@ def create_excel_report(input_dir: str, output_dir: str, fb_ads_file: str):
                 if message and ad_archive_id:
                     _, violation = parse_complaint(message)
                     if violation:
-                        # Get additional ad information from the ads lookup
-                        ad_data = ads_lookup.get(ad_archive_id, {})
-                        if ad_data:
-                            page_id = ad_data.get('page_id', '')
-
-                            report_entry = {
-                                "page link": f"https://www.facebook.com/{page_id}" if page_id else '',
-                                "page name": ad_data.get('page_name', ''),
-                                "ads link": f"https://www.facebook.com/ads/library/?id={ad_archive_id}",
-                                "ad spend": ad_data.get('spend', ''),
-                                "ad impressions": ad_data.get('impressions_with_index', {}).get('impressions_text', ''),
-                                "ad start date": ad_data.get('start_date', ''),
-                                "ad end date": ad_data.get('end_date', ''),
-                                "summary": violation
-                            }
-
-                            report_data.append(report_entry)
+                        violations.append(VerdictRecord(ad_archive_id, entity, violation=violation))
 
         except Exception as e:
             print(f"Error processing {filename}: {str(e)}")
 
+    with ads_index:
+        ads_lookup = ads_index.lookup(record.ad_archive_id for record in violations)
+
+    report_data = []
+    for record in violations:
+        # Get additional ad information from the ads index
+        ad_data = ads_lookup.get(record.ad_archive_id)
+        if ad_data:
+            record.set_metadata(
+                page_name=ad_data['page_name'],
+                page_id=ad_data['page_id'],
+                spend=ad_data['spend'],
+                impressions=ad_data['impressions_text'],
+                start_date=ad_data['start_date'],
+                end_date=ad_data['end_date']
+            )
+            report_data.append(record)
+
     print("Finished processing all JSON files.")
     print("Total violations found:", len(report_data))
 
     if report_data:
         try:
             os.makedirs(output_dir, exist_ok=True)
-            output_file = os.path.join(output_dir, 'funky_report.xlsx')
-
-            # Create DataFrame and save to Excel
-            df = pd.DataFrame(report_data)
-
-            # Reorder columns
-            columns_order = [
-                "page name",
-                "page link",
-                "ads link",
-                "ad spend",
-                "ad impressions",
-                "ad start date",
-                "ad end date",
-                "summary"
-            ]
-
-            df = df[columns_order]
-
-            # Write to Excel with some formatting
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Report')
-
-                # Auto-adjust columns width
-                worksheet = writer.sheets['Report']
-                for idx, col in enumerate(df.columns):
-                    max_length = max(df[col].astype(str).apply(len).max(), len(col))
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length + 2, 100)
-
-            print(f"Report generated: {output_file}")
+
+            # Rows are built in COLUMNS_ORDER straight from the records
+            df = pd.DataFrame.from_records((
+                (
+                    record.page_name,
+                    f"https://www.facebook.com/{record.page_id}" if record.page_id else '',
+                    f"https://www.facebook.com/ads/library/?id={record.ad_archive_id}",
+                    record.spend,
+                    record.impressions,
+                    record.start_date,
+                    record.end_date,
+                    record.violation
+                )
+                for record in report_data
+            ), columns=COLUMNS_ORDER)
+            del report_data
+
+            write_report(df, output_dir)
         except Exception as e:
             print(f"Error creating Excel report: {str(e)}")
     else:
@@ -143,6 +245,6 @@ def create_excel_report(input_dir: str, output_dir: str, fb_ads_file: str):
 if __name__ == "__main__":
     input_dir = os.path.join('ai', 'analysis')
     output_dir = os.path.join('rapoarte')
-    fb_ads_file = os.path.join('results', 'fb_ads_results_20241130_162320.json')
+    results_dir = os.path.join('results')
 
-    create_excel_report(input_dir, output_dir, fb_ads_file)
\ No newline at end of file
+    create_excel_report(input_dir, output_dir, results_dir)
\ No newline at end of file
@@ -0,0 +1,144 @@
+import os
+import glob
+import json
+import sqlite3
+from typing import Dict, Iterable, List
+
+# Only the fields the reports need are kept in the index
+INDEXED_FIELDS = ['page_id', 'page_name', 'spend', 'impressions_text', 'start_date', 'end_date']
+SQLITE_MAX_VARIABLES = 900
+
+
+def _to_column_value(value):
+    """SQLite only stores scalars, nested values are kept as JSON text"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class AdsMetadataIndex:
+    """Persistent SQLite index over every fb_ads_results_*.json file, keyed by ad_archive_id"""
+
+    def __init__(self, db_path: str = os.path.join('results', 'ads_index.sqlite')):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS ads (
+                ad_archive_id TEXT PRIMARY KEY,
+                {', '.join(INDEXED_FIELDS)},
+                source TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _is_indexed(self, path: str, stat: os.stat_result) -> bool:
+        row = self.conn.execute('SELECT mtime, size FROM sources WHERE path = ?', (path,)).fetchone()
+        return row is not None and row[0] == stat.st_mtime and row[1] == stat.st_size
+
+    def _ingest_file(self, path: str, stat: os.stat_result) -> int:
+        """Index a single results file, newer snapshots win over older ones"""
+        with open(path, 'r', encoding='utf-8') as f:
+            ads = json.load(f).get('ads', [])
+
+        source = os.path.basename(path)
+        rows = []
+        for ad in ads:
+            ad_id = ad.get('ad_archive_id')
+            if not ad_id:
+                continue
+            rows.append((
+                str(ad_id),
+                _to_column_value(ad.get('page_id', '')),
+                _to_column_value(ad.get('page_name', '')),
+                _to_column_value(ad.get('spend', '')),
+                _to_column_value((ad.get('impressions_with_index') or {}).get('impressions_text', '')),
+                _to_column_value(ad.get('start_date', '')),
+                _to_column_value(ad.get('end_date', '')),
+                source
+            ))
+
+        updates = ', '.join(f'{field} = excluded.{field}' for field in INDEXED_FIELDS + ['source'])
+        with self.conn:
+            self.conn.executemany(f"""
+                INSERT INTO ads (ad_archive_id, {', '.join(INDEXED_FIELDS)}, source)
+                VALUES ({', '.join('?' * (len(INDEXED_FIELDS) + 2))})
+                ON CONFLICT(ad_archive_id) DO UPDATE SET {updates}
+                WHERE excluded.source >= ads.source
+            """, rows)
+            self.conn.execute(
+                'INSERT OR REPLACE INTO sources (path, mtime, size) VALUES (?, ?, ?)',
+                (path, stat.st_mtime, stat.st_size)
+            )
+        return len(rows)
+
+    def _prune(self, paths: List[str]):
+        """
+        Forget the indexed files that are no longer on disk, with the ads they provided.
+        Those ads may also be in older snapshots, which are indexed again for them.
+        """
+        on_disk = set(paths)
+        indexed = [row[0] for row in self.conn.execute('SELECT path FROM sources')]
+        removed = [path for path in indexed if path not in on_disk]
+        if not removed:
+            return
+
+        newest_removed = max(os.path.basename(path) for path in removed)
+        with self.conn:
+            self.conn.executemany('DELETE FROM ads WHERE source = ?',
+                                  [(os.path.basename(path),) for path in removed])
+            self.conn.executemany('DELETE FROM sources WHERE path = ?', [(path,) for path in removed])
+            self.conn.executemany('DELETE FROM sources WHERE path = ?',
+                                  [(path,) for path in indexed
+                                   if path not in removed and os.path.basename(path) < newest_removed])
+        print(f"Removed {len(removed)} results files no longer on disk from the index")
+
+    def refresh(self, results_dir: str = 'results') -> List[str]:
+        """Index any results file that is new or changed since the last refresh, and drop deleted ones"""
+        pattern = os.path.join(results_dir, 'fb_ads_results_[0-9]*.json')
+        paths = sorted(glob.glob(pattern))
+        self._prune(paths)
+        ingested = []
+
+        # File names carry the scrape timestamp, so sorting them keeps ingestion chronological
+        for path in paths:
+            stat = os.stat(path)
+            if self._is_indexed(path, stat):
+                continue
+            count = self._ingest_file(path, stat)
+            print(f"Indexed {count} ads from {path}")
+            ingested.append(path)
+
+        return ingested
+
+    def lookup(self, ad_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Fetch the indexed fields for the given ad_archive_ids only"""
+        ad_ids = list(dict.fromkeys(str(ad_id) for ad_id in ad_ids))
+        found = {}
+
+        for start in range(0, len(ad_ids), SQLITE_MAX_VARIABLES):
+            chunk = ad_ids[start:start + SQLITE_MAX_VARIABLES]
+            cursor = self.conn.execute(
+                f"SELECT ad_archive_id, {', '.join(INDEXED_FIELDS)} FROM ads "
+                f"WHERE ad_archive_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            for row in cursor:
+                found[row[0]] = dict(zip(INDEXED_FIELDS, row[1:]))
+
+        return found
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM ads').fetchone()[0]
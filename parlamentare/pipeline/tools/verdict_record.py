@@ -0,0 +1,113 @@
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+# Fields with few distinct values, shared between verdicts once interned
+INTERNED_FIELDS = ('party', 'page_name', 'reach', 'impressions', 'currency', 'start_date', 'end_date')
+
+
+def intern_text(value: Any) -> Any:
+    """Intern strings (so equal values share one object), leave anything else as is"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
+class VerdictRecord:
+    """
+    One graded ad, as passed between the pipeline stages.
+
+    Slotted (no per-instance __dict__), with the repetitive strings (parties, candidates,
+    impacts, pages, audience ranges, currencies, dates) interned, so a million verdicts
+    share a few thousand string objects instead of holding their own copies.
+    """
+    ad_archive_id: str
+    party: str
+    is_propaganda: bool = True
+    candidates: Tuple[Tuple[str, str], ...] = ()  # (name, impact)
+    violation: Optional[str] = None  # Text of the complaint
+    page_name: Optional[str] = None
+    page_id: Optional[str] = None
+    reach: Optional[str] = None  # Estimated audience range
+    impressions: Optional[str] = None
+    spend: Any = None  # Average spend, or the spend text of the Ads Library
+    currency: Optional[str] = None
+    start_date: Any = None
+    end_date: Any = None
+
+    def __post_init__(self):
+        for field in INTERNED_FIELDS:
+            setattr(self, field, intern_text(getattr(self, field)))
+        self.candidates = tuple((sys.intern(name), sys.intern(impact)) for name, impact in self.candidates)
+
+    @classmethod
+    def from_verdict(cls, verdict: Dict[str, Any]) -> 'VerdictRecord':
+        """Record of a verdict parsed by tools.verdicts.extract_verdict"""
+        candidates = tuple((candidate['name'], candidate['impact']) for candidate in verdict['candidates'])
+        return cls(verdict['post_id'], verdict['responsible_party'], verdict['is_propaganda'], candidates)
+
+    def set_metadata(self, **metadata):
+        """Fill in ad metadata, interning the repetitive fields"""
+        for field, value in metadata.items():
+            setattr(self, field, intern_text(value) if field in INTERNED_FIELDS else value)
+
+
+def benchmark_memory(count: int = 1_000_000):
+    """Per-verdict memory of the dicts of strings the stages used, against VerdictRecord"""
+    parties = ['PSD', 'PNL', 'USR', 'AUR', 'INDEPENDENT', 'SOS ROMANIA', 'POT', 'UDMR']
+    candidates = ['ION-MARCEL CIOLACU', 'ELENA-VALERICA LASCONI', 'GEORGE-NICOLAE SIMION', 'NICOLAE-IONEL CIUCA']
+    impacts = ['POSITIVE', 'NEGATIVE']
+    reaches = ['10,000-50,000', '50,001-100,000', '100,001-500,000', '>1,000,001']
+
+    def fresh(text: str) -> str:
+        # A new string object, as every parsed file yields its own copy
+        return (text + ' ')[:-1]
+
+    def verdict_fields(index: int):
+        return (
+            str(1000000000000000 + index),
+            fresh(parties[index % len(parties)]),
+            [(fresh(candidates[(index + offset) % len(candidates)]), fresh(impacts[(index + offset) % 2]))
+             for offset in range(index % 3)],
+            fresh(reaches[index % len(reaches)]),
+            float(index % 5000),
+            fresh('RON'),
+            fresh(f'2024-11-{10 + index % 14}')
+        )
+
+    results = {}
+    for name in ['dict', 'VerdictRecord']:
+        tracemalloc.start()
+        started = time.perf_counter()
+        verdicts = []
+        for index in range(count):
+            ad_id, party, verdict_candidates, reach, spend, currency, start_date = verdict_fields(index)
+            if name == 'dict':
+                verdicts.append({
+                    'post_id': ad_id,
+                    'responsible_party': party,
+                    'is_propaganda': True,
+                    'candidates': [{'name': candidate, 'impact': impact} for candidate, impact in verdict_candidates],
+                    'reach': reach,
+                    'spend': {'lower_bound': 0.0, 'upper_bound': spend * 2, 'average': spend},
+                    'currency': currency,
+                    'start_date': start_date,
+                    'end_date': None
+                })
+            else:
+                verdicts.append(VerdictRecord(ad_id, party, True, verdict_candidates, reach=reach, spend=spend,
+                                              currency=currency, start_date=start_date))
+        elapsed = time.perf_counter() - started
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del verdicts
+        results[name] = current / count
+        print(f"{name}: {current / count:.0f} bytes/verdict, {current / 1e6:.0f}MB for {count} verdicts "
+              f"(built in {elapsed:.2f}s)")
+
+    print(f"VerdictRecord uses {results['dict'] / results['VerdictRecord']:.1f}x less memory")
+
+
+if __name__ == "__main__":
+    benchmark_memory(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
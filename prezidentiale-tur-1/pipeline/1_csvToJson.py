@@ -1,74 +1,360 @@
-# Full script as requested
-
+import gc
 import os
-import pandas as pd
+import hashlib
+import sys
 import json
+import time
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Dict, List, Set
+
+import numpy as np
+import pandas as pd
+
+from tools.dataset import (BOUNDS_COLUMNS, BOUNDS_FIELDS, DATASET_JSON_PATH, DATASET_PARQUET_PATH,
+                           append_ads_parquet, write_ads_parquet)
 
-# Define the directory containing the CSV files
+# Constants
+NUM_THREADS = min(8, os.cpu_count() or 1)
 directory_path = "extrase-meta"
+output_enriched_json_path = DATASET_JSON_PATH
+output_enriched_parquet_path = DATASET_PARQUET_PATH
+ingest_state_path = "ingest_state.json"
+CAMPAIGN_CUTOFF = datetime(2024, 11, 22)
+BENCHMARK_REPLICAS = 100
 
-# Load and merge all CSV files from the specified directory
-all_dataframes = []
-for file in os.listdir(directory_path):
-    if file.endswith('.csv'):
-        file_path = os.path.join(directory_path, file)
-        try:
-            df = pd.read_csv(file_path)
-            all_dataframes.append(df)
-        except Exception as e:
-            print(f"Error processing {file}: {e}")
-
-# Concatenate all dataframes
-merged_df = pd.concat(all_dataframes, ignore_index=True)
-
-# Filter out rows where 'ad_delivery_stop_time' is before '2024-11-22'
-if 'ad_delivery_stop_time' in merged_df.columns:
-    merged_df['ad_delivery_stop_time'] = pd.to_datetime(
-        merged_df['ad_delivery_stop_time'], errors='coerce'
-    )
-    merged_df = merged_df[
-        (merged_df['ad_delivery_stop_time'].isna()) |
-        (merged_df['ad_delivery_stop_time'] >= datetime(2024, 11, 22))
-    ]
-
-# Remove duplicates based on 'ad_archive_id'
-merged_df = merged_df.drop_duplicates(subset=['ad_archive_id'])
-
-# Process nested JSON fields: 'demographic_distribution' and 'delivery_by_region'
-def process_nested_json(column):
-    if column in merged_df.columns:
-        merged_df[column] = merged_df[column].apply(
-            lambda x: json.loads(f"[{x}]") if isinstance(x, str) else None
-        )
+# Explicit dtypes, so pandas doesn't have to infer them for every extract
+CSV_DTYPES = {
+    'ad_archive_id': 'Int64',
+    'page_id': 'Int64',
+    'page_name': object,
+    'ad_creation_time': object,
+    'ad_delivery_start_time': object,
+    'ad_delivery_stop_time': object,
+    'byline': object,
+    'ad_creative_bodies': object,
+    'ad_creative_link_titles': object,
+    'ad_creative_link_captions': object,
+    'ad_creative_link_descriptions': object,
+    'impressions': object,
+    'spend': object,
+    'currency': object,
+    'demographic_distribution': object,
+    'delivery_by_region': object,
+    'publisher_platforms': object,
+    'estimated_audience_size': object,
+    'languages': object,
+}
+
+NESTED_JSON_COLUMNS = ['demographic_distribution', 'delivery_by_region']
+BOUNDS_PATTERN = r'lower_bound:\s*(?P<lower_bound>-?[\d.]+),\s*upper_bound:\s*(?P<upper_bound>-?[\d.]+)'
+
+
+def list_extract_files(directory: str) -> List[str]:
+    """List the volunteer CSV extracts (sorted, so dedup keeps the same ad on every run)"""
+    return [os.path.join(directory, file) for file in sorted(os.listdir(directory)) if file.endswith('.csv')]
+
+
+def read_extract(file_path: str) -> pd.DataFrame:
+    """Read a single volunteer extract with explicit dtypes"""
+    try:
+        return pd.read_csv(file_path, dtype=CSV_DTYPES)
+    except Exception as e:
+        print(f"Error processing {os.path.basename(file_path)}: {e}")
+        return None
+
+
+def read_extracts(file_paths: List[str], num_threads: int = NUM_THREADS) -> pd.DataFrame:
+    """Read all extracts in parallel and concatenate them in file order"""
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        dataframes = [df for df in executor.map(read_extract, file_paths) if df is not None]
+
+    return pd.concat(dataframes, ignore_index=True)
+
+
+def filter_and_deduplicate(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop ads stopped before the campaign cutoff and duplicate ad_archive_ids"""
+    if 'ad_delivery_stop_time' in df.columns:
+        df['ad_delivery_stop_time'] = pd.to_datetime(df['ad_delivery_stop_time'], errors='coerce')
+        df = df[
+            (df['ad_delivery_stop_time'].isna()) |
+            (df['ad_delivery_stop_time'] >= CAMPAIGN_CUTOFF)
+        ]
+
+    return df.drop_duplicates(subset=['ad_archive_id'])
+
+
+def extract_bounds(df: pd.DataFrame, column: str):
+    """Parse 'lower_bound: X, upper_bound: Y' into numeric <column>_lower_bound/_upper_bound/_average columns"""
+    if column not in df.columns:
+        return
 
-process_nested_json('demographic_distribution')
-process_nested_json('delivery_by_region')
-
-
-# Enrich 'impressions' and 'spend' by converting to objects and calculating averages
-def process_bounds_column(column):
-    if column in merged_df.columns:
-        def convert_to_object(value):
-            try:
-                bounds = value.split(',')
-                lower_bound = float(bounds[0].split(': ')[1])
-                upper_bound = float(bounds[1].split(': ')[1])
-                return {
-                    'lower_bound': lower_bound,
-                    'upper_bound': upper_bound,
-                    'average': (lower_bound + upper_bound) / 2
-                }
-            except (IndexError, ValueError):
-                return None
-
-        merged_df[column] = merged_df[column].apply(
-            lambda x: convert_to_object(x) if isinstance(x, str) else None
+    bounds = df[column].str.extract(BOUNDS_PATTERN).astype('float64')
+    df[f'{column}_lower_bound'] = bounds['lower_bound']
+    df[f'{column}_upper_bound'] = bounds['upper_bound']
+    df[f'{column}_average'] = (bounds['lower_bound'] + bounds['upper_bound']) / 2
+
+
+def parse_nested_json(df: pd.DataFrame, column: str):
+    """Parse the comma-separated JSON objects of a column into lists, with a single json.loads call"""
+    if column not in df.columns:
+        return
+
+    present = df[column].notna().to_numpy()
+    values = df[column].to_numpy(dtype=object)[present]
+    parsed = json.loads('[[' + '],['.join(values) + ']]') if len(values) else []
+
+    nested = np.full(len(df), None, dtype=object)
+    for position, value in zip(np.flatnonzero(present), parsed):
+        nested[position] = value
+    df[column] = nested
+
+
+def ingest_extracts(file_paths: List[str], known_ids: Set[int] = None, num_threads: int = NUM_THREADS) -> pd.DataFrame:
+    """Typed, vectorized ingestion of the given volunteer extracts, skipping ads already in known_ids"""
+    df = read_extracts(file_paths, num_threads)
+    df = filter_and_deduplicate(df)
+    if known_ids:
+        df = df[~df['ad_archive_id'].isin(known_ids)]
+    df = df.copy()
+
+    for column in NESTED_JSON_COLUMNS:
+        parse_nested_json(df, column)
+
+    for column in BOUNDS_COLUMNS:
+        extract_bounds(df, column)
+
+    return df
+
+
+def nest_bounds(df: pd.DataFrame) -> pd.DataFrame:
+    """Fold the numeric bounds columns back into the {'lower_bound', 'upper_bound', 'average'} objects"""
+    df = df.copy()
+
+    for column in BOUNDS_COLUMNS:
+        flat_columns = [f'{column}_{field}' for field in BOUNDS_FIELDS]
+        if flat_columns[0] not in df.columns:
+            continue
+
+        bounds = df[flat_columns]
+        records = bounds.set_axis(BOUNDS_FIELDS, axis=1).to_dict('records')
+        valid = bounds[flat_columns[2]].notna().to_numpy()
+
+        df[column] = pd.Series(
+            [record if is_valid else None for record, is_valid in zip(records, valid)],
+            index=df.index, dtype=object
         )
+        df = df.drop(columns=flat_columns)
+
+    return df
+
+
+def write_enriched_json(df: pd.DataFrame, output_path: str):
+    """Save the enriched data in the record-oriented JSON format the later stages read"""
+    nest_bounds(df).to_json(output_path, orient='records', indent=4)
+
+
+def write_enriched_parquet(df: pd.DataFrame, output_path: str, append: bool = False):
+    """Save the columnar copy of the enriched data, which the later stages read column by column"""
+    try:
+        if append:
+            append_ads_parquet(df, output_path)
+        else:
+            write_ads_parquet(df, output_path)
+    except ImportError:
+        print("pyarrow is not installed, skipping the Parquet dataset")
+
+
+def append_enriched_json(df: pd.DataFrame, output_path: str):
+    """Append records to the JSON dataset in place, without re-reading what is already there"""
+    new_records = nest_bounds(df).to_json(orient='records', indent=4)
+
+    with open(output_path, 'rb+') as f:
+        # The file ends with the closing ']' of the records array
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(max(end - 16, 0))
+        tail = f.read()
+        closing = tail.rfind(b']')
+        if closing < 0:
+            raise ValueError(f"{output_path} is not a JSON array")
+
+        # Continue right after the last record, so the layout matches a full build
+        last_record_end = len(tail[:closing].rstrip())
+        existing_is_empty = tail[:last_record_end].endswith(b'[')
+        f.seek(end - len(tail) + last_record_end)
+        separator = '' if existing_is_empty else ','
+        f.write((separator + new_records[1:]).encode('utf-8'))
+        f.truncate()
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of an extract, so a re-sent or renamed file is recognised as already ingested"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_ingest_state(state_path: str) -> Dict:
+    """Load the hashes of the ingested extracts and the ad_archive_ids already in the dataset"""
+    if not os.path.exists(state_path):
+        return {'files': {}, 'ad_archive_ids': []}
+
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_ingest_state(state: Dict, state_path: str):
+    """Persist the ingest state atomically, so an interrupted run can't corrupt it"""
+    temp_path = f"{state_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(temp_path, state_path)
+
+
+def build_full(directory: str):
+    """Rebuild the whole dataset from every extract and reset the ingest state"""
+    file_paths = list_extract_files(directory)
+    merged_df = ingest_extracts(file_paths)
+
+    # Save the final enriched data to JSON, plus the columnar copy
+    write_enriched_json(merged_df, output_enriched_json_path)
+    write_enriched_parquet(merged_df, output_enriched_parquet_path)
+
+    files = {os.path.basename(path): hash_file(path) for path in file_paths}
+    ad_archive_ids = [int(ad_id) for ad_id in merged_df['ad_archive_id']]
+    save_ingest_state({
+        'files': files,
+        'ad_archive_ids': ad_archive_ids,
+        'parquet': {'files': dict(files), 'ad_archive_ids': list(ad_archive_ids)},
+    }, ingest_state_path)
+    print(f"Ingested {len(file_paths)} extracts, {len(merged_df)} unique ads")
+
+
+def build_incremental(directory: str):
+    """
+    Ingest only the extracts not seen before, appending the ads that aren't in the dataset yet.
+
+    The JSON and the Parquet datasets each keep their own ingested extracts and ads in the
+    state (the top-level entries for the JSON, 'parquet' for the Parquet), saved as soon as
+    that output is appended, so a failure in one step neither loses nor repeats the other's.
+    """
+    state = load_ingest_state(ingest_state_path)
+    if not state['files'] or not os.path.exists(output_enriched_json_path):
+        print("No previous ingest found, running a full build")
+        build_full(directory)
+        return
+
+    # States written before the outputs were tracked apart had both in sync
+    state.setdefault('parquet', {'files': dict(state['files']), 'ad_archive_ids': list(state['ad_archive_ids'])})
+
+    outputs = [('JSON', state, output_enriched_json_path, append_enriched_json)]
+    if os.path.exists(output_enriched_parquet_path):
+        outputs.append(('Parquet', state['parquet'], output_enriched_parquet_path,
+                        lambda df, path: write_enriched_parquet(df, path, append=True)))
+    else:
+        print(f"{output_enriched_parquet_path} is missing, run a full build to recreate it")
+
+    file_hashes = {path: hash_file(path) for path in list_extract_files(directory)}
+    ingested = None
+    for name, output_state, output_path, append in outputs:
+        ingested_hashes = set(output_state['files'].values())
+        new_paths = [path for path, file_hash in file_hashes.items() if file_hash not in ingested_hashes]
+        if not new_paths:
+            print(f"No new extracts to ingest into the {name} dataset")
+            continue
+
+        # Both outputs are usually behind by the same extracts, parse them once
+        known_ids = set(output_state['ad_archive_ids'])
+        if ingested is None or ingested[0] != new_paths or ingested[1] != known_ids:
+            ingested = (new_paths, known_ids, ingest_extracts(new_paths, known_ids))
+        new_df = ingested[2]
+
+        if len(new_df):
+            append(new_df, output_path)
+
+        output_state['files'].update({os.path.basename(path): file_hashes[path] for path in new_paths})
+        output_state['ad_archive_ids'].extend(int(ad_id) for ad_id in new_df['ad_archive_id'])
+        save_ingest_state(state, ingest_state_path)
+        print(f"{name}: ingested {len(new_paths)} new extracts, appended {len(new_df)} new ads")
+
+
+def benchmark(directory: str = directory_path, replicas: int = BENCHMARK_REPLICAS):
+    """Compare the row-wise ingestion against the typed, vectorized one on the extracts replicated N times"""
+
+    def convert_to_object(value):
+        try:
+            bounds = value.split(',')
+            lower_bound = float(bounds[0].split(': ')[1])
+            upper_bound = float(bounds[1].split(': ')[1])
+            return {
+                'lower_bound': lower_bound,
+                'upper_bound': upper_bound,
+                'average': (lower_bound + upper_bound) / 2
+            }
+        except (IndexError, ValueError):
+            return None
+
+    def parse_rowwise(df):
+        for column in NESTED_JSON_COLUMNS:
+            df[column] = df[column].apply(lambda x: json.loads(f"[{x}]") if isinstance(x, str) else None)
+        for column in BOUNDS_COLUMNS:
+            df[column] = df[column].apply(lambda x: convert_to_object(x) if isinstance(x, str) else None)
+
+    def parse_vectorized(df):
+        for column in NESTED_JSON_COLUMNS:
+            parse_nested_json(df, column)
+        for column in BOUNDS_COLUMNS:
+            extract_bounds(df, column)
+
+    pipelines = {
+        'row-wise': (lambda paths: pd.concat([pd.read_csv(path) for path in paths], ignore_index=True),
+                     parse_rowwise),
+        'vectorized': (read_extracts, parse_vectorized),
+    }
+
+    # Dedup is skipped on purpose, it would collapse the replicas back to one copy
+    benchmark_dir = tempfile.mkdtemp(prefix='extrase-meta-benchmark-')
+    try:
+        for replica in range(replicas):
+            for path in list_extract_files(directory):
+                shutil.copy(path, os.path.join(benchmark_dir, f"{replica:04d}_{os.path.basename(path)}"))
+        paths = list_extract_files(benchmark_dir)
+
+        totals = {}
+        for name, (read, parse) in pipelines.items():
+            started = time.perf_counter()
+            df = read(paths)
+            read_elapsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            parse(df)
+            parse_elapsed = time.perf_counter() - started
+
+            totals[name] = read_elapsed + parse_elapsed
+            print(f"{name}: {len(df)} rows, read {read_elapsed:.2f}s, parse {parse_elapsed:.2f}s, "
+                  f"total {totals[name]:.2f}s")
+
+            # Don't let the previous frame's memory skew the next measurement
+            del df
+            gc.collect()
+
+        print(f"Speedup: {totals['row-wise'] / totals['vectorized']:.1f}x "
+              f"({replicas} replicas, {NUM_THREADS} reader threads)")
+    finally:
+        shutil.rmtree(benchmark_dir)
+
 
-process_bounds_column('impressions')
-process_bounds_column('spend')
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark()
+        sys.exit(0)
 
-# Save the final enriched data to JSON
-output_enriched_json_path = "final_enriched_meta_ad_data.json"
-merged_df.to_json(output_enriched_json_path, orient='records', indent=4)
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == '--incremental':
+        build_incremental(directory_path)
+    else:
+        build_full(directory_path)
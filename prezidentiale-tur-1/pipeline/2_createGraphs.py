@@ -1,69 +1,116 @@
-import json
-import matplotlib.pyplot as plt
+import sys
+import time
 import pandas as pd
 import os
 
-# Create the output directory for graphs
+from tools.charts import Chart, render_charts
+from tools.dataset import read_ads_frame
+
+# Constants
 output_dir = "graphs"
-os.makedirs(output_dir, exist_ok=True)
+HOURS_PER_DAY = 24
+DEADLINE_WINDOW_HOURS = 6  # Hours between the end of the campaign and the start of the vote
+TOP_PAGES = 50  # Only take top 50, very wide plots
+BENCHMARK_REPLICAS = 1000
 
-# Load JSON data
-input_json_file = "final_enriched_meta_ad_data.json"  # Replace with your JSON file name
-with open(input_json_file, 'r') as f:
-    data = json.load(f)
 
+def load_ads() -> pd.DataFrame:
+    """Load only the columns the graphs need, with impressions/spend as numeric columns"""
+    df = read_ads_frame(
+        columns=['page_name', 'ad_delivery_start_time', 'impressions', 'spend'],
+        flatten_bounds=True
+    )
 
-# Get date of modified of the JSON
+    df['ad_delivery_start_time'] = pd.to_datetime(df['ad_delivery_start_time'], errors='coerce')
+    df['ad_delivery_days'] = (pd.to_datetime('today') - df['ad_delivery_start_time']).dt.days + 1
+    return df
 
 
-# Convert to DataFrame for easier processing
-df = pd.DataFrame(data)
+def project_after_deadline(df: pd.DataFrame, window_hours: float = DEADLINE_WINDOW_HOURS) -> pd.DataFrame:
+    """
+    Project the share of each ad's impressions and spend delivered after the deadline,
+    assuming an even delivery over the days the ad ran.
 
-df['ad_delivery_start_time'] = pd.to_datetime(df['ad_delivery_start_time'], errors='coerce')
-df['ad_delivery_days'] = (pd.to_datetime('today') - df['ad_delivery_start_time']).dt.days + 1
+    Args:
+        df: Ads with impressions_average, spend_average and ad_delivery_days columns
+        window_hours: Length of the window after the deadline, in hours
 
-# Process impressions and spend into averages if not already done
-if 'impressions' in df.columns:
-    df['impressions_avg'] = df['impressions'].apply(
-        lambda x: x['average'] if isinstance(x, dict) and 'average' in x else None
-    )
+    Returns:
+        The same DataFrame, with impressions_after_deadline and spend_after_deadline columns
+    """
+    window_share = window_hours / HOURS_PER_DAY
+    delivery_days = df['ad_delivery_days']
 
-    # Check impressions after deadline
-    df['impressions_after_deadline'] = df['impressions_avg'] / df['ad_delivery_days'] / 24 * 6
+    df['impressions_after_deadline'] = df['impressions_average'] / delivery_days * window_share
+    df['spend_after_deadline'] = df['spend_average'] / delivery_days * window_share
+    return df
 
 
-if 'spend' in df.columns:
-    df['spend_avg'] = df['spend'].apply(
-        lambda x: x['average'] if isinstance(x, dict) and 'average' in x else None
-    )
+def render_page_bars(figure, data):
+    """Bar chart of a per-page total"""
+    series, title, ylabel = data
+    ax = figure.subplots()
+    series.plot(kind='bar', title=title, ax=ax)
+    ax.set_ylabel(ylabel)
+    ax.set_xlabel('Page Name')
+    figure.tight_layout()
+
+
+def benchmark(replicas: int = BENCHMARK_REPLICAS):
+    """Compare the dict-in-cell apply projection with the vectorized one on the dataset replicated N times"""
+    dict_df = read_ads_frame(columns=['ad_delivery_start_time', 'impressions', 'spend'])
+    dict_df = pd.concat([dict_df] * replicas, ignore_index=True)
+    dict_df['ad_delivery_days'] = (
+        pd.to_datetime('today') - pd.to_datetime(dict_df['ad_delivery_start_time'], errors='coerce')
+    ).dt.days + 1
+
+    started = time.perf_counter()
+    for column in ['impressions', 'spend']:
+        average = dict_df[column].apply(lambda x: x['average'] if isinstance(x, dict) and 'average' in x else None)
+        dict_df[f'{column}_after_deadline'] = average / dict_df['ad_delivery_days'] / HOURS_PER_DAY * DEADLINE_WINDOW_HOURS
+    apply_elapsed = time.perf_counter() - started
+
+    numeric_df = read_ads_frame(columns=['ad_delivery_start_time', 'impressions', 'spend'], flatten_bounds=True)
+    numeric_df = pd.concat([numeric_df] * replicas, ignore_index=True)
+    numeric_df['ad_delivery_days'] = dict_df['ad_delivery_days']
+
+    started = time.perf_counter()
+    project_after_deadline(numeric_df)
+    vectorized_elapsed = time.perf_counter() - started
+
+    for column in ['impressions_after_deadline', 'spend_after_deadline']:
+        pd.testing.assert_series_equal(dict_df[column].astype('float64'), numeric_df[column], check_names=False)
+
+    print(f"{len(numeric_df)} rows: apply {apply_elapsed:.3f}s, vectorized {vectorized_elapsed:.3f}s "
+          f"({apply_elapsed / vectorized_elapsed:.0f}x)")
 
-    df['spend_after_deadline'] = df['spend_avg'] / df['ad_delivery_days'] / 24 * 6
 
-# 1. Plot total spend by page name
-spend_by_page = df.groupby('page_name')['spend_after_deadline'].sum().sort_values(ascending=False)
+def main(window_hours: float = DEADLINE_WINDOW_HOURS):
+    # Create the output directory for graphs
+    os.makedirs(output_dir, exist_ok=True)
 
-# 2. Plot total impressions by page name
-impressions_by_page = df.groupby('page_name')['impressions_after_deadline'].sum().sort_values(ascending=False)
+    df = project_after_deadline(load_ads(), window_hours)
 
-# Only take top 50, very wide plots
-spend_by_page = spend_by_page.head(50)
-impressions_by_page = impressions_by_page.head(50)
+    # 1. Plot total spend by page name
+    spend_by_page = df.groupby('page_name')['spend_after_deadline'].sum().sort_values(ascending=False)
 
+    # 2. Plot total impressions by page name
+    impressions_by_page = df.groupby('page_name')['impressions_after_deadline'].sum().sort_values(ascending=False)
 
-# Save the plots
-spend_by_page.plot(kind='bar', title='Total Spend by Page Name')
-plt.ylabel('Spend')
-plt.xlabel('Page Name')
-plt.tight_layout()
-plt.savefig(f"{output_dir}/total_spend_by_page.png")
-plt.close()
+    # Save the plots (unchanged aggregates are not re-rendered)
+    render_charts([
+        Chart('total_spend_by_page.png', render_page_bars,
+              (spend_by_page.head(TOP_PAGES), 'Total Spend by Page Name', 'Spend')),
+        Chart('total_impressions_by_page.png', render_page_bars,
+              (impressions_by_page.head(TOP_PAGES), 'Total Impressions by Page Name', 'Impressions')),
+    ], output_dir)
 
-impressions_by_page.plot(kind='bar', title='Total Impressions by Page Name')
-plt.ylabel('Impressions')
-plt.xlabel('Page Name')
-plt.tight_layout()
-plt.savefig(f"{output_dir}/total_impressions_by_page.png")
-plt.close()
+    print(f"Graphs saved in the '{output_dir}' folder.")
 
 
-print(f"Graphs saved in the '{output_dir}' folder.")
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark()
+    else:
+        # Optional argument: length of the after-deadline window, in hours
+        main(float(sys.argv[1]) if len(sys.argv) > 1 else DEADLINE_WINDOW_HOURS)
@@ -1,5 +1,4 @@
 import os
-import json
 from concurrent.futures import ProcessPoolExecutor, as_completed
 import anthropic
 import sys
@@ -8,9 +7,12 @@ from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor
 import threading
 
+from tools.dataset import read_ad_records
+
 # Constants
 NUM_THREADS = 8
 output_path = 'ai/analysis'
+IGNORED_FIELDS = ['demographic_distribution', 'delivery_by_region']
 
 
 @dataclass
@@ -45,10 +47,10 @@ def process_single_ad(ad_data: Dict[str, Any], system_prompt: str, user_prompt_t
         update_stats(success=True, skipped=True)
         return True
 
-    # Drop irrelevant fields to not overuse tokens
+    # Drop irrelevant fields to not overuse tokens (usually not even read from the dataset)
     processed_data = ad_data.copy()
-    processed_data.pop('demographic_distribution', None)
-    processed_data.pop('delivery_by_region', None)
+    for field in IGNORED_FIELDS:
+        processed_data.pop(field, None)
 
     # Don't handle ones without a 'ad_creative_bodies'
     if not processed_data['ad_creative_bodies']:
@@ -104,8 +106,8 @@ def read_prompt(file_path: str) -> str:
         return file.read()
 
 
-def process_ads(json_file_path: str, api_key: str, max_ads: int = None):
-    """Process all ads from the JSON file using multiple threads"""
+def process_ads(dataset_path: str, api_key: str, max_ads: int = None):
+    """Process all ads from the dataset using multiple threads"""
     # Read prompts
     system_prompt = read_prompt('ai/prompts/grader/system-prompt.txt')
     user_prompt_template = read_prompt('ai/prompts/grader/user-prompt.txt')
@@ -113,9 +115,8 @@ def process_ads(json_file_path: str, api_key: str, max_ads: int = None):
     # Create output directory
     os.makedirs(output_path, exist_ok=True)
 
-    # Read JSON file
-    with open(json_file_path, 'r', encoding='utf-8') as file:
-        ads_data = json.load(file)
+    # Read the dataset, skipping the columns that never reach the prompt
+    ads_data = read_ad_records(dataset_path, exclude=IGNORED_FIELDS)
 
     # Limit number of ads if specified
     if max_ads:
@@ -159,7 +160,7 @@ if __name__ == "__main__":
         sys.exit(1)
 
     api_key = sys.argv[1]
-    json_file_path = 'final_enriched_meta_ad_data.json'
+    dataset_path = None  # Parquet dataset when available, JSON otherwise
     max_ads = None
 
-    process_ads(json_file_path, api_key, max_ads)
\ No newline at end of file
+    process_ads(dataset_path, api_key, max_ads)
\ No newline at end of file
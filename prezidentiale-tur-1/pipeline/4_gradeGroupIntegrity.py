@@ -1,36 +1,122 @@
 import os
 import re
+import sys
+import time
+import tempfile
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from typing import Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import json
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-import unicodedata
+from tools.charts import Chart, render_charts
+from tools.dataset import resolve_dataset_path
+from tools.metadata_index import AdMetadataIndex
+from tools.party_stats import party_precision_stats
+from tools.verdict_record import VerdictRecord
+from tools.verdicts import PartyNormalizer, extract_verdict
+
+# Metadata fields parse_file reads for every verdict
+METADATA_COLUMNS = [
+    'ad_archive_id',
+    'estimated_audience_size',
+    'spend',
+    'currency',
+    'ad_delivery_start_time',
+    'ad_delivery_stop_time'
+]
+# (impact type, key in the summary, key for the parties behind it)
+IMPACT_TYPES = [
+    ('POSITIVE', 'positive_impact', 'promoting_parties'),
+    ('NEGATIVE', 'negative_impact', 'attacking_parties')
+]
+ANALYZE_CHUNK_SIZE = 500  # Verdict files per worker task
+PARSE_CACHE_FILENAME = '.parse_cache.json'
+PARSE_CACHE_VERSION = 2
+# Fields attach_metadata sets on a verdict (cached alongside the parse result)
+VERDICT_METADATA_FIELDS = ['reach', 'spend', 'currency', 'start_date', 'end_date']
+BENCHMARK_REPLICAS = 100
+
+
+def _party_barplot(ax, series: pd.Series, title: str, ylabel: str):
+    """Seaborn bar plot of a per-party aggregate on the given axes"""
+    # seaborn (and pyplot with it) is only imported when a chart is actually rendered
+    import seaborn as sns
+
+    sns.barplot(x=series.index, y=series.values, ax=ax)
+    ax.set_title(title, fontsize=14, pad=20)
+    ax.set_xlabel('Party', fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+def render_violations_summary(figure, aggregates: Dict[str, pd.Series]):
+    """Render the 2x2 violations summary"""
+    axes = figure.subplots(2, 2)
+
+    # 1. Violations by Party
+    _party_barplot(axes[0, 0], aggregates['party_counts'], 'Violations by Party', 'Number of Violations')
+
+    # 2. Total Reach by Party
+    _party_barplot(axes[0, 1], aggregates['reach_by_party'], 'Total Reach by Party', 'Total Reach')
+
+    # 3. Average Spend by Party
+    _party_barplot(axes[1, 0], aggregates['spend_by_party'], 'Average Spend by Party (RON)', 'Average Spend')
+
+    # 4. Violation Severity Score
+    _party_barplot(axes[1, 1], aggregates['severity_by_party'], 'Violation Severity Score by Party',
+                   'Severity Score')
+
+    figure.tight_layout()
+
+
+def render_false_positives_analysis(figure, aggregates: Dict[str, Any]):
+    """Render the false positive rate and precision per party"""
+    axes = figure.subplots(1, 2)
+
+    # 1. False Positive Rate by Party
+    _party_barplot(axes[0], aggregates['fp_rates'], 'False Positive Rate by Party', 'False Positive Rate (%)')
+
+    # 2. Precision by Party
+    _party_barplot(axes[1], aggregates['precision']['precision'], 'Precision by Party', 'Precision')
+
+    figure.tight_layout()
+
+
+def parse_verdict_files(file_paths: List[str]) -> List[Optional[Tuple]]:
+    """
+    Parse a chunk of verdict files (runs in the worker processes).
+
+    Returns:
+        One (post_id, party, is_propaganda, ((name, impact), ...)) tuple per file,
+        None for files without a usable verdict
+    """
+    parsed = []
+    for file_path in file_paths:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                verdict = extract_verdict(f.read())
+        except Exception as e:
+            print(f"Error processing file {file_path}: {str(e)}")
+            verdict = None
 
+        if verdict is None:
+            parsed.append(None)
+            continue
 
-class PartyNormalizer:
-    @staticmethod
-    def normalize_party_name(name: str) -> str:
-        """
-        Normalize party name by:
-        1. Converting to uppercase
-        2. Removing diacritics
-        3. Removing special characters
-        4. Normalizing spaces
-        """
-        # Convert to uppercase
-        name = name.upper()
+        candidates = tuple((candidate['name'], candidate['impact']) for candidate in verdict['candidates'])
+        parsed.append((verdict['post_id'], verdict['responsible_party'], verdict['is_propaganda'], candidates))
 
-        # Remove diacritics
-        name = unicodedata.normalize('NFKD', name).encode('ASCII', 'ignore').decode('ASCII')
+    return parsed
 
-        # Remove special characters and normalize spaces
-        name = re.sub(r'[^\w\s]', '', name)
-        name = ' '.join(name.split())
 
-        return name
+def _file_signature(path: str) -> Optional[List[int]]:
+    """(mtime, size) of a file, None when it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
 
 
 class ElectoralAnalyzer:
@@ -45,39 +131,39 @@ class ElectoralAnalyzer:
         """
         self.input_folder = input_folder
         self.output_folder = output_folder
+        self.metadata_file = metadata_file
         self.violations_data = []
-        self.metadata = self._load_metadata(metadata_file)
+        self._metadata = None
+        self.metadata_failed = False
 
         # Create output directory if it doesn't exist
         os.makedirs(output_folder, exist_ok=True)
 
+    @property
+    def metadata(self) -> Dict:
+        """Metadata index, only loaded the first time a verdict needs it"""
+        if self._metadata is None:
+            self._metadata = self._load_metadata(self.metadata_file)
+        return self._metadata
+
     def _load_metadata(self, metadata_file: str) -> Dict:
         """
         Load and index the metadata file by ad_archive_id for efficient lookups.
+        Only the columns parse_file needs are read, and kept column-wise.
 
         Args:
-            metadata_file: Path to the metadata JSON file
+            metadata_file: Path to the metadata Parquet or JSON file
 
         Returns:
-            Dict mapping ad_archive_id to metadata
+            Mapping of ad_archive_id to metadata (records are built on lookup)
         """
         try:
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                metadata_list = json.load(f)
-
-            # Create an indexed dictionary for O(1) lookups
-            return {str(item['ad_archive_id']): item for item in metadata_list}
+            return AdMetadataIndex.from_dataset(metadata_file, METADATA_COLUMNS)
         except Exception as e:
             print(f"Error loading metadata file: {str(e)}")
+            self.metadata_failed = True
             return {}
 
-    def extract_ad_id_from_xml(self, content: str) -> str:
-        """
-        Extract post_id from XML content which maps to ad_archive_id in metadata.
-        """
-        match = re.search(r'<post_id>(.*?)</post_id>', content, re.DOTALL)
-        return match.group(1).strip() if match else None
-
     def extract_numbers_from_range(self, range_str: str) -> Tuple[int, int]:
         """Extract lower and upper bounds from a range string"""
         numbers = re.findall(r'[\d,]+', str(range_str))
@@ -94,50 +180,35 @@ class ElectoralAnalyzer:
 
     def extract_xml_content(self, text: str) -> Dict:
         """Extract XML-like content using regex with propaganda detection"""
-        output_match = re.search(r'<output>(.*?)</output>', text, re.DOTALL)
-        if not output_match:
-            return None
-
-        output_content = output_match.group(1)
-        conclusion_match = re.search(r'<conclusion>(.*?)</conclusion>', output_content, re.DOTALL)
-        if not conclusion_match:
-            return None
-
-        conclusion_content = conclusion_match.group(1)
-
-        # Extract fields
-        fields = {
-            'post_id': re.search(r'<post_id>(.*?)</post_id>', conclusion_content),
-            'propaganda_decision': re.search(r'<electoral-propaganda-decision>(.*?)</electoral-propaganda-decision>',
-                                             conclusion_content),
-            'responsible_party': re.search(r'<responsible-party-or-group>(.*?)</responsible-party-or-group>',
-                                           conclusion_content)
-        }
-
-        if not all(fields.values()):
-            return None
-
-        # Track both TRUE and FALSE cases
-        propaganda_result = fields['propaganda_decision'].group(1).strip()
-
-        # Extract candidates for TRUE cases
-        candidates = []
-        if propaganda_result == 'TRUE':
-            candidate_pattern = r'<candidate>\s*<name>(.*?)</name>\s*<impact>(.*?)</impact>\s*</candidate>'
-            for match in re.finditer(candidate_pattern, conclusion_content):
-                candidates.append({
-                    'name': match.group(1).strip(),
-                    'impact': match.group(2).strip()
-                })
-
-        return {
-            'post_id': fields['post_id'].group(1).strip(),
-            'responsible_party': PartyNormalizer.normalize_party_name(fields['responsible_party'].group(1).strip()),
-            'is_propaganda': propaganda_result == 'TRUE',
-            'candidates': candidates
-        }
-
-    def parse_file(self, file_path: str) -> Dict:
+        return extract_verdict(text)
+
+    def attach_metadata(self, record: VerdictRecord, file_path: str) -> VerdictRecord:
+        """Complete a parsed verdict with the reach, spend and dates of its ad"""
+        post_id = record.ad_archive_id
+        if not post_id:
+            print(f"Warning: No post_id found in {file_path}")
+            return record
+
+        # Lookup metadata using post_id as ad_archive_id
+        ad_metadata = self.metadata.get(post_id, {})
+        if not ad_metadata:
+            print(f"Warning: No metadata found for post_id/ad_archive_id {post_id}")
+            # Set default values if no metadata found
+            record.set_metadata(reach='0-0', spend=0.0, currency='RON', start_date=None, end_date=None)
+        else:
+            # Update with metadata from the enriched file (only the average spend is used)
+            spend = ad_metadata.get('spend', {'average': 0})
+            record.set_metadata(
+                reach=ad_metadata.get('estimated_audience_size', '0-0'),
+                spend=spend['average'] if isinstance(spend, dict) else spend,
+                currency=ad_metadata.get('currency', 'RON'),
+                start_date=ad_metadata.get('ad_delivery_start_time'),
+                end_date=ad_metadata.get('ad_delivery_stop_time')
+            )
+
+        return record
+
+    def parse_file(self, file_path: str) -> Optional[VerdictRecord]:
         """Parse a single file and extract information"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -147,212 +218,189 @@ class ElectoralAnalyzer:
             if not violation_data:
                 return None
 
-            # Extract post_id from XML (which corresponds to ad_archive_id)
-            post_id = self.extract_ad_id_from_xml(content)
-            if not post_id:
-                print(f"Warning: No post_id found in {file_path}")
-                return violation_data
-
-            # Lookup metadata using post_id as ad_archive_id
-            ad_metadata = self.metadata.get(post_id, {})
-            if not ad_metadata:
-                print(f"Warning: No metadata found for post_id/ad_archive_id {post_id}")
-                # Set default values if no metadata found
-                violation_data.update({
-                    'reach': '0-0',
-                    'spend': {'lower_bound': 0, 'upper_bound': 0, 'average': 0},
-                    'currency': 'RON',
-                    'start_date': None,
-                    'end_date': None
-                })
-            else:
-                # Update with metadata from the enriched file
-                violation_data.update({
-                    'reach': ad_metadata.get('estimated_audience_size', '0-0'),
-                    'spend': ad_metadata.get('spend', {
-                        'lower_bound': 0,
-                        'upper_bound': 0,
-                        'average': 0
-                    }),
-                    'currency': ad_metadata.get('currency', 'RON'),
-                    'start_date': ad_metadata.get('ad_delivery_start_time'),
-                    'end_date': ad_metadata.get('ad_delivery_stop_time')
-                })
-
-            return violation_data
+            return self.attach_metadata(VerdictRecord.from_verdict(violation_data), file_path)
 
         except Exception as e:
             print(f"Error processing file {file_path}: {str(e)}")
             return None
 
-    def analyze_all_files(self):
-        """Process all files in input folder"""
-        for filename in os.listdir(self.input_folder):
-            if filename.endswith('.xml'):
-                file_path = os.path.join(self.input_folder, filename)
-                violation_data = self.parse_file(file_path)
-                if violation_data:
-                    self.violations_data.append(violation_data)
+    def analyze_all_files(self, max_workers: Optional[int] = None, chunk_size: int = ANALYZE_CHUNK_SIZE,
+                          use_cache: bool = True):
+        """
+        Process all files in input folder. Only files that are new or changed since the
+        last run (by mtime and size) are parsed; chunks of them are parsed in a process
+        pool and merged back in file name order, whatever order the workers finish in.
+
+        Args:
+            max_workers: Worker processes, defaults to one per chunk up to the CPU count
+            chunk_size: Files parsed per task
+            use_cache: Reuse the parse results (and metadata) cached by the previous run
+        """
+        filenames = sorted(filename for filename in os.listdir(self.input_folder) if filename.endswith('.xml'))
+        stats = {filename: _file_signature(os.path.join(self.input_folder, filename)) for filename in filenames}
+
+        cache = self._load_parse_cache() if use_cache else {}
+        if cache.get('version') != PARSE_CACHE_VERSION:
+            cache = {}
+        dataset_signature = _file_signature(self.metadata_file)
+        if cache.get('dataset') != dataset_signature:
+            # The verdicts are still valid, only their metadata has to be joined again
+            for entry in cache.get('files', {}).values():
+                entry['metadata'] = None
+        cached_files = cache.get('files', {})
+
+        entries = {filename: cached_files[filename] for filename in filenames
+                   if filename in cached_files and cached_files[filename]['stat'] == stats[filename]}
+        changed = [filename for filename in filenames if filename not in entries]
+
+        chunks = [changed[start:start + chunk_size] for start in range(0, len(changed), chunk_size)]
+        for chunk, parsed in zip(chunks, self._parse_chunks(chunks, max_workers)):
+            for filename, verdict in zip(chunk, parsed):
+                entries[filename] = {'stat': stats[filename], 'verdict': verdict, 'metadata': None}
+
+        # Rebuild the verdicts in file order, joining metadata only where it isn't cached
+        for filename in filenames:
+            entry = entries[filename]
+            if entry['verdict'] is None:
+                continue
+
+            post_id, party, is_propaganda, candidates = entry['verdict']
+            record = VerdictRecord(post_id, party, is_propaganda, candidates)
+            if entry['metadata'] is None:
+                self.attach_metadata(record, os.path.join(self.input_folder, filename))
+                # Defaults set because the metadata couldn't be loaded aren't cached
+                if record.reach is not None and not self.metadata_failed:
+                    entry['metadata'] = [getattr(record, field) for field in VERDICT_METADATA_FIELDS]
+            else:
+                record.set_metadata(**dict(zip(VERDICT_METADATA_FIELDS, entry['metadata'])))
+            self.violations_data.append(record)
+
+        if use_cache:
+            self._save_parse_cache({'version': PARSE_CACHE_VERSION, 'dataset': dataset_signature, 'files': entries})
+        print(f"Verdicts: {len(changed)} parsed, {len(filenames) - len(changed)} cached")
+
+    def _parse_chunks(self, chunks: List[List[str]], max_workers: Optional[int]) -> Iterable[List[Optional[Tuple]]]:
+        """Parse chunks of file names, yielding the results in chunk order"""
+        chunks = [[os.path.join(self.input_folder, filename) for filename in chunk] for chunk in chunks]
+        if max_workers is None:
+            max_workers = min(len(chunks), os.cpu_count() or 1)
+
+        # Starting worker processes isn't worth it for a single chunk
+        if max_workers <= 1 or len(chunks) <= 1:
+            return [parse_verdict_files(chunk) for chunk in chunks]
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # map yields the results in submission order
+            return list(executor.map(parse_verdict_files, chunks))
+
+    def _load_parse_cache(self) -> Dict:
+        cache_path = os.path.join(self.output_folder, PARSE_CACHE_FILENAME)
+        if not os.path.exists(cache_path):
+            return {}
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_parse_cache(self, cache: Dict):
+        cache_path = os.path.join(self.output_folder, PARSE_CACHE_FILENAME)
+        temp_path = f"{cache_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, cache_path)
+
+    def build_impact_frame(self, full_df: pd.DataFrame) -> pd.DataFrame:
+        """One numeric row per (violation, affected candidate)"""
+        impacts = full_df.loc[full_df['is_propaganda'], ['party', 'reach', 'spend', 'candidates']]
+        impacts = impacts.explode('candidates').dropna(subset=['candidates'])
+
+        return pd.DataFrame({
+            'candidate': impacts['candidates'].str[0],
+            'impact_type': impacts['candidates'].str[1],
+            'party_responsible': impacts['party'],
+            'reach': impacts['reach'].astype('float64'),
+            'spend': impacts['spend'].astype('float64'),
+            'impact_weight': (impacts['reach'] * impacts['spend'] / 1000000).astype('float64')
+        })
 
     def calculate_impact_summary(self, impact_df: pd.DataFrame) -> Dict:
         """Calculate comprehensive impact summary including totals"""
-        positive_impacts = impact_df[impact_df['impact_type'] == 'POSITIVE']
-        negative_impacts = impact_df[impact_df['impact_type'] == 'NEGATIVE']
-
-        summary = {
-            'positive_impact': {
-                'total_spend': positive_impacts['spend'].apply(
-                    lambda x: x['average'] if isinstance(x, dict) else x).sum(),
-                'total_reach': positive_impacts['reach'].sum(),
-                'total_posts': len(positive_impacts),
-                'by_candidate': []
-            },
-            'negative_impact': {
-                'total_spend': negative_impacts['spend'].apply(
-                    lambda x: x['average'] if isinstance(x, dict) else x).sum(),
-                'total_reach': negative_impacts['reach'].sum(),
-                'total_posts': len(negative_impacts),
-                'by_candidate': []
-            }
-        }
-
-        # Process positive impacts
-        pos_by_candidate = positive_impacts.groupby('candidate').agg({
-            'spend': lambda x: sum(d['average'] if isinstance(d, dict) else d for d in x),
-            'reach': 'sum',
-            'impact_weight': 'sum',
-            'party_responsible': lambda x: list(set(x))
-        }).reset_index()
-
-        summary['positive_impact']['by_candidate'] = [
-            {
-                'candidate': row['candidate'],
-                'total_spend': row['spend'],
-                'total_reach': row['reach'],
-                'impact_score': row['impact_weight'],
-                'promoting_parties': row['party_responsible']
+        summary = {}
+        for impact_type, summary_key, parties_key in IMPACT_TYPES:
+            impacts = impact_df[impact_df['impact_type'] == impact_type]
+
+            # Top 5 candidates by impact, with the parties behind it in order of appearance
+            by_candidate = impacts.groupby('candidate').agg(
+                spend=('spend', 'sum'),
+                reach=('reach', 'sum'),
+                impact_weight=('impact_weight', 'sum'),
+                parties=('party_responsible', 'unique')
+            ).nlargest(5, 'impact_weight')
+
+            summary[summary_key] = {
+                'total_spend': impacts['spend'].sum(),
+                'total_reach': impacts['reach'].sum(),
+                'total_posts': len(impacts),
+                'by_candidate': [
+                    {
+                        'candidate': candidate,
+                        'total_spend': spend,
+                        'total_reach': reach,
+                        'impact_score': abs(impact_weight),
+                        parties_key: parties.tolist()
+                    }
+                    for candidate, spend, reach, impact_weight, parties in by_candidate.itertuples()
+                ]
             }
-            for _, row in pos_by_candidate.nlargest(5, 'impact_weight').iterrows()
-        ]
-
-        # Process negative impacts
-        neg_by_candidate = negative_impacts.groupby('candidate').agg({
-            'spend': 'sum',
-            'reach': 'sum',
-            'impact_weight': 'sum',
-            'party_responsible': lambda x: list(set(x))
-        }).reset_index()
-
-        summary['negative_impact']['by_candidate'] = [
-            {
-                'candidate': row['candidate'],
-                'total_spend': row['spend'],
-                'total_reach': row['reach'],
-                'impact_score': abs(row['impact_weight']),
-                'attacking_parties': row['party_responsible']
-            }
-            for _, row in neg_by_candidate.nlargest(5, 'impact_weight').iterrows()
-        ]
 
         return summary
 
-    def plot_violations_summary(self, violations_df: pd.DataFrame):
-        """Create summary visualizations"""
-        plt.figure(figsize=(20, 15))
-
+    def violations_summary_chart(self, violations_df: pd.DataFrame) -> Chart:
+        """Aggregate the per-party violation statistics into the summary chart"""
         # Make a copy of the DataFrame to avoid the warning
         df = violations_df.copy()
 
-        # 1. Violations by Party
-        plt.subplot(2, 2, 1)
-        party_counts = df['party'].value_counts()
-        sns.barplot(x=party_counts.index, y=party_counts.values)
-        plt.title('Violations by Party', fontsize=14, pad=20)
-        plt.xlabel('Party', fontsize=12)
-        plt.ylabel('Number of Violations', fontsize=12)
-        plt.xticks(rotation=45)
-
-        # 2. Total Reach by Party
-        plt.subplot(2, 2, 2)
-        reach_by_party = df.groupby('party')['reach'].sum()
-        sns.barplot(x=reach_by_party.index, y=reach_by_party.values)
-        plt.title('Total Reach by Party', fontsize=14, pad=20)
-        plt.xlabel('Party', fontsize=12)
-        plt.ylabel('Total Reach', fontsize=12)
-        plt.xticks(rotation=45)
-
-        # 3. Average Spend by Party
-        plt.subplot(2, 2, 3)
-        spend_by_party = df.groupby('party')['spend'].mean()
-        sns.barplot(x=spend_by_party.index, y=spend_by_party.values)
-        plt.title('Average Spend by Party (RON)', fontsize=14, pad=20)
-        plt.xlabel('Party', fontsize=12)
-        plt.ylabel('Average Spend', fontsize=12)
-        plt.xticks(rotation=45)
-
-        # 4. Violation Severity Score
-        plt.subplot(2, 2, 4)
         # Calculate severity score on the copy
         df.loc[:, 'severity_score'] = (df['reach'] * df['spend']) / 1000000
-        severity_by_party = df.groupby('party')['severity_score'].mean()
-        sns.barplot(x=severity_by_party.index, y=severity_by_party.values)
-        plt.title('Violation Severity Score by Party', fontsize=14, pad=20)
-        plt.xlabel('Party', fontsize=12)
-        plt.ylabel('Severity Score', fontsize=12)
-        plt.xticks(rotation=45)
-
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.output_folder, 'violations_summary.png'),
-                    dpi=300, bbox_inches='tight')
-        plt.close()
+
+        aggregates = {
+            'party_counts': df['party'].value_counts(),
+            'reach_by_party': df.groupby('party')['reach'].sum(),
+            'spend_by_party': df.groupby('party')['spend'].mean(),
+            'severity_by_party': df.groupby('party')['severity_score'].mean()
+        }
+        return Chart('violations_summary.png', render_violations_summary, aggregates,
+                     figsize=(20, 15), dpi=300, savefig_kwargs={'bbox_inches': 'tight'})
+
+    def false_positives_chart(self, violations_df: pd.DataFrame, false_positives_df: pd.DataFrame) -> Chart:
+        """Aggregate the per-party false positive statistics into the analysis chart"""
+        stats = party_precision_stats(pd.concat([violations_df, false_positives_df]))
+
+        aggregates = {
+            'fp_rates': stats['fp_rate'].sort_values(ascending=False),
+            'precision': stats[['precision']]
+        }
+        return Chart('false_positives_analysis.png', render_false_positives_analysis, aggregates,
+                     figsize=(20, 10), dpi=300, savefig_kwargs={'bbox_inches': 'tight'})
+
+    def plot_violations_summary(self, violations_df: pd.DataFrame):
+        """Create summary visualizations"""
+        render_charts([self.violations_summary_chart(violations_df)], self.output_folder)
 
     def plot_false_positives_analysis(self, violations_df: pd.DataFrame, false_positives_df: pd.DataFrame):
         """Create visualizations for false positives analysis"""
-        plt.figure(figsize=(20, 10))
-
-        # 1. False Positive Rate by Party
-        plt.subplot(1, 2, 1)
-        fp_rates = self.calculate_fp_rates_by_party(violations_df, false_positives_df)
-        sns.barplot(x=fp_rates.index, y=fp_rates.values)
-        plt.title('False Positive Rate by Party', fontsize=14, pad=20)
-        plt.xlabel('Party', fontsize=12)
-        plt.ylabel('False Positive Rate (%)', fontsize=12)
-        plt.xticks(rotation=45)
-
-        # 2. Precision by Party
-        plt.subplot(1, 2, 2)
-        precision = self.calculate_precision_by_party(pd.concat([violations_df, false_positives_df]))
-        precision_df = pd.DataFrame.from_dict(precision, orient='index', columns=['precision'])
-        sns.barplot(x=precision_df.index, y=precision_df['precision'])
-        plt.title('Precision by Party', fontsize=14, pad=20)
-        plt.xlabel('Party', fontsize=12)
-        plt.ylabel('Precision', fontsize=12)
-        plt.xticks(rotation=45)
-
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.output_folder, 'false_positives_analysis.png'),
-                    dpi=300, bbox_inches='tight')
-        plt.close()
+        render_charts([self.false_positives_chart(violations_df, false_positives_df)], self.output_folder)
 
     def calculate_fp_rates_by_party(self, violations_df: pd.DataFrame,
                                     false_positives_df: pd.DataFrame) -> pd.Series:
         """Calculate false positive rates for each party"""
-        total_by_party = pd.concat([violations_df, false_positives_df])['party'].value_counts()
-        fp_by_party = false_positives_df['party'].value_counts()
-
-        fp_rates = (fp_by_party / total_by_party * 100).round(2)
-        return fp_rates.sort_values(ascending=False)
+        stats = party_precision_stats(pd.concat([violations_df, false_positives_df]))
+        return stats['fp_rate'].sort_values(ascending=False)
 
     def calculate_precision_by_party(self, df: pd.DataFrame) -> Dict[str, float]:
         """Calculate precision by party"""
-        precision = {}
-        for party in df['party'].unique():
-            party_data = df[df['party'] == party]
-            true_positives = sum(party_data['is_propaganda'])
-            total = len(party_data)
-            precision[party] = (true_positives / total) if total > 0 else 0
-
-        return precision
+        return party_precision_stats(df)['precision'].to_dict()
 
     def generate_analysis(self):
         """Generate complete analysis"""
@@ -362,44 +410,35 @@ class ElectoralAnalyzer:
 
         # Create DataFrames
         data_entries = []
-        impact_entries = []
 
         for v in self.violations_data:
-            entry = {
-                'party': v['responsible_party'],
-                'reach': float(self.calculate_reach_score(v['reach'])),  # Ensure float
-                'spend': float(v['spend']['average'] if isinstance(v['spend'], dict) else v['spend']),  # Ensure float
-                'candidates_affected': int(len(v.get('candidates', []))),  # Ensure int
-                'start_date': v['start_date'],
-                'end_date': v['end_date'],
-                'is_propaganda': bool(v['is_propaganda'])  # Ensure bool
-            }
-            data_entries.append(entry)
-
-            if v['is_propaganda']:
-                for c in v['candidates']:
-                    impact_entries.append({
-                        'candidate': c['name'],
-                        'impact_type': c['impact'],
-                        'party_responsible': v['responsible_party'],
-                        'reach': float(entry['reach']),  # Ensure float
-                        'spend': float(entry['spend']),  # Ensure float
-                        'impact_weight': float((entry['reach'] * entry['spend']) / 1000000)  # Ensure float
-                    })
+            data_entries.append({
+                'party': v.party,
+                'reach': float(self.calculate_reach_score(v.reach)),  # Ensure float
+                'spend': float(v.spend),  # Ensure float
+                'candidates_affected': len(v.candidates),
+                'start_date': v.start_date,
+                'end_date': v.end_date,
+                'is_propaganda': bool(v.is_propaganda),  # Ensure bool
+                'candidates': v.candidates
+            })
 
         full_df = pd.DataFrame(data_entries)
-        impact_df = pd.DataFrame(impact_entries)
+        impact_df = self.build_impact_frame(full_df)
 
         # Split into violations and false positives
         violations_df = full_df[full_df['is_propaganda']].copy()  # Make a copy
         false_positives_df = full_df[~full_df['is_propaganda']].copy()  # Make a copy
 
-        # Generate visualizations
-        self.plot_violations_summary(violations_df)
-        self.plot_false_positives_analysis(violations_df, false_positives_df)
+        # Generate visualizations (rendered in parallel, skipped when the aggregates didn't change)
+        render_charts([
+            self.violations_summary_chart(violations_df),
+            self.false_positives_chart(violations_df, false_positives_df)
+        ], self.output_folder)
 
         # Calculate impact summary
         impact_summary = self.calculate_impact_summary(impact_df)
+        party_stats = party_precision_stats(full_df)
 
         # Generate complete statistics with explicit type conversion
         stats = {
@@ -412,7 +451,9 @@ class ElectoralAnalyzer:
                 'violations_by_party': {k: int(v) for k, v in violations_df['party'].value_counts().to_dict().items()},
                 'false_positives_by_party': {k: int(v) for k, v in
                                              false_positives_df['party'].value_counts().to_dict().items()},
-                'precision_by_party': {k: float(v) for k, v in self.calculate_precision_by_party(full_df).items()},
+                'precision_by_party': {k: float(v) for k, v in party_stats['precision'].items()},
+                'precision_interval_by_party': {k: [float(low), float(high)] for k, low, high in
+                                                party_stats[['precision_low', 'precision_high']].itertuples()},
                 'total_reach': float(violations_df['reach'].sum()),
                 'total_spend': float(violations_df['spend'].sum()),
                 'avg_severity_by_party': {k: float(v) for k, v in
@@ -432,7 +473,7 @@ class ElectoralAnalyzer:
 def main():
     analyzer = ElectoralAnalyzer(
         input_folder='ai/analysis',
-        metadata_file='final_enriched_meta_ad_data.json'
+        metadata_file=resolve_dataset_path()
     )
     analyzer.analyze_all_files()
     stats = analyzer.generate_analysis()
@@ -496,5 +537,160 @@ def main():
     print("3. analysis_summary.json - Date complete în format JSON")
 
 
+def _extract_verdict_multipass(text: str) -> Dict:
+    """The previous parser (one regex per field, then the file re-scanned for post_id), kept for the benchmark"""
+    output_match = re.search(r'<output>(.*?)</output>', text, re.DOTALL)
+    if not output_match:
+        return None
+    conclusion_match = re.search(r'<conclusion>(.*?)</conclusion>', output_match.group(1), re.DOTALL)
+    if not conclusion_match:
+        return None
+    conclusion_content = conclusion_match.group(1)
+
+    fields = {
+        'post_id': re.search(r'<post_id>(.*?)</post_id>', conclusion_content),
+        'propaganda_decision': re.search(r'<electoral-propaganda-decision>(.*?)</electoral-propaganda-decision>',
+                                         conclusion_content),
+        'responsible_party': re.search(r'<responsible-party-or-group>(.*?)</responsible-party-or-group>',
+                                       conclusion_content)
+    }
+    if not all(fields.values()):
+        return None
+
+    propaganda_result = fields['propaganda_decision'].group(1).strip()
+    candidates = []
+    if propaganda_result == 'TRUE':
+        candidate_pattern = r'<candidate>\s*<name>(.*?)</name>\s*<impact>(.*?)</impact>\s*</candidate>'
+        for match in re.finditer(candidate_pattern, conclusion_content):
+            candidates.append({'name': match.group(1).strip(), 'impact': match.group(2).strip()})
+
+    re.search(r'<post_id>(.*?)</post_id>', text, re.DOTALL)
+    return {
+        'post_id': fields['post_id'].group(1).strip(),
+        'responsible_party': PartyNormalizer.normalize_party_name(fields['responsible_party'].group(1).strip()),
+        'is_propaganda': propaganda_result == 'TRUE',
+        'candidates': candidates
+    }
+
+
+def benchmark_parser(input_folder: str = 'ai/analysis', replicas: int = BENCHMARK_REPLICAS):
+    """Compare the multi-pass and single-pass verdict parsers on the verdicts replicated N times"""
+    contents = []
+    for filename in sorted(os.listdir(input_folder)):
+        if filename.endswith('.xml'):
+            with open(os.path.join(input_folder, filename), 'r', encoding='utf-8') as f:
+                contents.append(f.read())
+    contents = contents * replicas
+
+    started = time.perf_counter()
+    multipass = [_extract_verdict_multipass(content) for content in contents]
+    multipass_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    single_pass = [extract_verdict(content) for content in contents]
+    single_pass_elapsed = time.perf_counter() - started
+
+    assert multipass == single_pass, "Parsers disagree"
+    print(f"{len(contents)} verdicts: multi-pass {multipass_elapsed:.3f}s, single-pass {single_pass_elapsed:.3f}s "
+          f"({multipass_elapsed / single_pass_elapsed:.1f}x)")
+
+
+def _calculate_impact_summary_lambdas(impact_df: pd.DataFrame) -> Dict:
+    """The previous impact summary (Python lambdas in groupby.agg, iterrows), kept as the reference"""
+    positive_impacts = impact_df[impact_df['impact_type'] == 'POSITIVE']
+    negative_impacts = impact_df[impact_df['impact_type'] == 'NEGATIVE']
+
+    summary = {
+        'positive_impact': {
+            'total_spend': positive_impacts['spend'].apply(lambda x: x['average'] if isinstance(x, dict) else x).sum(),
+            'total_reach': positive_impacts['reach'].sum(),
+            'total_posts': len(positive_impacts),
+            'by_candidate': []
+        },
+        'negative_impact': {
+            'total_spend': negative_impacts['spend'].apply(lambda x: x['average'] if isinstance(x, dict) else x).sum(),
+            'total_reach': negative_impacts['reach'].sum(),
+            'total_posts': len(negative_impacts),
+            'by_candidate': []
+        }
+    }
+
+    pos_by_candidate = positive_impacts.groupby('candidate').agg({
+        'spend': lambda x: sum(d['average'] if isinstance(d, dict) else d for d in x),
+        'reach': 'sum',
+        'impact_weight': 'sum',
+        'party_responsible': lambda x: list(set(x))
+    }).reset_index()
+    summary['positive_impact']['by_candidate'] = [
+        {'candidate': row['candidate'], 'total_spend': row['spend'], 'total_reach': row['reach'],
+         'impact_score': row['impact_weight'], 'promoting_parties': row['party_responsible']}
+        for _, row in pos_by_candidate.nlargest(5, 'impact_weight').iterrows()
+    ]
+
+    neg_by_candidate = negative_impacts.groupby('candidate').agg({
+        'spend': 'sum',
+        'reach': 'sum',
+        'impact_weight': 'sum',
+        'party_responsible': lambda x: list(set(x))
+    }).reset_index()
+    summary['negative_impact']['by_candidate'] = [
+        {'candidate': row['candidate'], 'total_spend': row['spend'], 'total_reach': row['reach'],
+         'impact_score': abs(row['impact_weight']), 'attacking_parties': row['party_responsible']}
+        for _, row in neg_by_candidate.nlargest(5, 'impact_weight').iterrows()
+    ]
+
+    return summary
+
+
+def _comparable_impact_summary(summary: Dict) -> str:
+    """JSON of an impact summary with the party lists sorted (set order isn't stable across runs)"""
+    for impact in summary.values():
+        for candidate in impact['by_candidate']:
+            for key in ['promoting_parties', 'attacking_parties']:
+                if key in candidate:
+                    candidate[key] = sorted(candidate[key])
+    return json.dumps(summary, sort_keys=True)
+
+
+def benchmark_impact_summary(input_folder: str = 'ai/analysis', replicas: int = BENCHMARK_REPLICAS):
+    """
+    Check that the vectorized impact summary matches the lambda one on the real verdicts,
+    then compare both on the impact rows replicated N times
+    """
+    with tempfile.TemporaryDirectory() as output_folder:
+        analyzer = ElectoralAnalyzer(input_folder, resolve_dataset_path(), output_folder=output_folder)
+        analyzer.analyze_all_files()
+    full_df = pd.DataFrame([{
+        'party': v.party,
+        'reach': float(analyzer.calculate_reach_score(v.reach)),
+        'spend': float(v.spend),
+        'is_propaganda': v.is_propaganda,
+        'candidates': v.candidates
+    } for v in analyzer.violations_data])
+    impact_df = analyzer.build_impact_frame(full_df)
+
+    assert _comparable_impact_summary(analyzer.calculate_impact_summary(impact_df)) == \
+        _comparable_impact_summary(_calculate_impact_summary_lambdas(impact_df)), "Impact summaries differ"
+
+    # Distinct candidate names per replica, so the groups grow with the data
+    impact_df = pd.concat([impact_df.assign(candidate=impact_df['candidate'] + f' #{replica}')
+                           for replica in range(replicas)], ignore_index=True)
+
+    started = time.perf_counter()
+    _calculate_impact_summary_lambdas(impact_df)
+    lambdas_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    analyzer.calculate_impact_summary(impact_df)
+    vectorized_elapsed = time.perf_counter() - started
+
+    print(f"{len(impact_df)} impact rows: lambdas {lambdas_elapsed:.3f}s, vectorized {vectorized_elapsed:.3f}s "
+          f"({lambdas_elapsed / vectorized_elapsed:.1f}x)")
+
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark_parser()
+        benchmark_impact_summary()
+    else:
+        main()
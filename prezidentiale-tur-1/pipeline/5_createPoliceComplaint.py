@@ -1,9 +1,11 @@
 import os
 import re
 from collections import defaultdict
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, List, Tuple
 import unicodedata
 
+from tools.verdict_record import VerdictRecord
+
 def extract_police_message(xml_content: str) -> Optional[str]:
     pattern = r'<message-for-police>(.*?)</message-for-police>'
     match = re.search(pattern, xml_content, re.DOTALL)
@@ -64,7 +66,7 @@ def escape_latex(text: str) -> str:
 
     return ''.join(parts)
 
-def create_latex_document(police_msg: str, complaints_by_entity: Dict[str, list], output_file: str):
+def create_latex_document(police_msg: str, complaints_by_entity: Dict[str, List[VerdictRecord]], output_file: str):
     latex_content = r"""\documentclass[a4paper,12pt]{article}
 \usepackage[romanian]{babel}
 \usepackage[utf8]{inputenc}
@@ -210,7 +212,7 @@ Analizele au fost efectuate in perioada 23.11.2024, incepand cu ora 21:00, pana
         # Enumerate violations with numerical labels
         latex_content += "\\begin{enumerate}[leftmargin=*, label=\\arabic*.)]\n"
         for violation in violations:
-            violation_escaped = escape_latex(violation)
+            violation_escaped = escape_latex(violation.violation)
             latex_content += f"    \\item {violation_escaped}\n"
         latex_content += "\\end{enumerate}\n"
 
@@ -278,7 +280,10 @@ def create_police_complaint(input_dir: str, output_dir: str):
                     police_msg = msg
                 entity, violation = parse_complaint(msg)
                 if violation:
-                    complaints_by_entity[entity].append(violation)
+                    # File names are ad_<ad_archive_id>.xml
+                    ad_archive_id = os.path.splitext(filename)[0].split('_', 1)[-1]
+                    record = VerdictRecord(ad_archive_id, entity, violation=violation)
+                    complaints_by_entity[record.party].append(record)
 
         except Exception as e:
             print(f"Error processing {filename}: {str(e)}")
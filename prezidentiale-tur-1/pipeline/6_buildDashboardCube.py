@@ -0,0 +1,268 @@
+import os
+import json
+from typing import Dict, List
+
+import pandas as pd
+
+from tools.dataset import read_ads_frame
+from tools.verdicts import extract_verdict
+
+# Constants
+input_folder = 'ai/analysis'
+output_folder = os.path.join('graphs', 'dashboard')
+DIMENSIONS = ['party', 'page', 'candidate', 'impact', 'hour']
+MEASURES = ['ads', 'spend', 'impressions', 'reach']
+NO_CANDIDATE = '(niciun candidat)'
+
+
+def violation_rows(verdict: Dict) -> List[Dict]:
+    """One row per candidate a violation affects (a single row when it names none)"""
+    base = {'ad_archive_id': verdict['post_id'], 'party': verdict['responsible_party']}
+    if not verdict['candidates']:
+        return [{**base, 'candidate': NO_CANDIDATE, 'impact': 'NONE'}]
+
+    return [{**base, 'candidate': candidate['name'], 'impact': candidate['impact']}
+            for candidate in verdict['candidates']]
+
+
+def load_violations(folder: str) -> pd.DataFrame:
+    """One row per violating ad and candidate it affects"""
+    rows = []
+    for filename in sorted(os.listdir(folder)):
+        if not filename.endswith('.xml'):
+            continue
+        try:
+            with open(os.path.join(folder, filename), 'r', encoding='utf-8') as f:
+                verdict = extract_verdict(f.read())
+        except Exception as e:
+            print(f"Error processing file {filename}: {str(e)}")
+            continue
+        if verdict and verdict['is_propaganda']:
+            rows.extend(violation_rows(verdict))
+
+    return pd.DataFrame(rows, columns=['ad_archive_id', 'party', 'candidate', 'impact'])
+
+
+def audience_midpoint(audience: pd.Series) -> pd.Series:
+    """Same reach score as ElectoralAnalyzer: midpoint of the audience range, 0 when it isn't a range"""
+    bounds = audience.astype('string').str.extract(r'([\d,]+)\D+([\d,]+)')
+    lower = pd.to_numeric(bounds[0].str.replace(',', ''), errors='coerce')
+    upper = pd.to_numeric(bounds[1].str.replace(',', ''), errors='coerce')
+    return ((lower + upper) / 2).fillna(0)
+
+
+def build_cube(violations: pd.DataFrame, ads: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate violations into the party x page x candidate x impact x hour cube.
+
+    An ad affecting several candidates is counted once for each of them, so totals
+    across candidates can exceed the real spend.
+    """
+    ads = ads.assign(
+        ad_archive_id=ads['ad_archive_id'].astype('string'),
+        hour=pd.to_datetime(ads['ad_delivery_start_time'], errors='coerce').dt.floor('h')
+                                                                           .dt.strftime('%Y-%m-%d %H:00'),
+        reach=audience_midpoint(ads['estimated_audience_size'])
+    )
+
+    df = violations.assign(ad_archive_id=violations['ad_archive_id'].astype('string')).merge(
+        ads[['ad_archive_id', 'page_name', 'hour', 'spend_average', 'impressions_average', 'reach']],
+        on='ad_archive_id', how='left'
+    )
+    df = df.rename(columns={'page_name': 'page', 'spend_average': 'spend', 'impressions_average': 'impressions'})
+    df[['page', 'hour']] = df[['page', 'hour']].fillna('(necunoscut)')
+
+    cube = df.groupby(DIMENSIONS, observed=True, sort=True).agg(
+        ads=('ad_archive_id', 'nunique'),
+        spend=('spend', 'sum'),
+        impressions=('impressions', 'sum'),
+        reach=('reach', 'sum')
+    ).reset_index()
+
+    return cube
+
+
+def encode_columnar(cube: pd.DataFrame) -> Dict:
+    """Dictionary-encode the dimensions and store every column as one array"""
+    encoded = {'dimensions': {}, 'measures': {}, 'rows': len(cube)}
+    for dimension in DIMENSIONS:
+        codes, values = pd.factorize(cube[dimension], sort=True)
+        encoded['dimensions'][dimension] = {'values': values.tolist(), 'codes': codes.tolist()}
+    for measure in MEASURES:
+        encoded['measures'][measure] = [round(float(value), 2) for value in cube[measure]]
+    return encoded
+
+
+def write_dashboard(encoded: Dict, output_path: str):
+    """Write the static dashboard, with the cube embedded so it opens straight from disk"""
+    data = json.dumps(encoded, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(DASHBOARD_TEMPLATE.replace('%cube-data%', data))
+
+
+def main():
+    violations = load_violations(input_folder)
+    ads = read_ads_frame(
+        columns=['ad_archive_id', 'page_name', 'ad_delivery_start_time', 'estimated_audience_size',
+                 'impressions', 'spend'],
+        flatten_bounds=True
+    )
+
+    cube = build_cube(violations, ads)
+    encoded = encode_columnar(cube)
+
+    os.makedirs(output_folder, exist_ok=True)
+    with open(os.path.join(output_folder, 'cube.json'), 'w', encoding='utf-8') as f:
+        json.dump(encoded, f, ensure_ascii=False, separators=(',', ':'))
+
+    try:
+        cube.to_parquet(os.path.join(output_folder, 'cube.parquet'), index=False)
+    except ImportError:
+        print("pyarrow is not installed, skipping cube.parquet")
+
+    write_dashboard(encoded, os.path.join(output_folder, 'dashboard.html'))
+
+    print(f"Cube: {len(violations)} violation rows aggregated into {len(cube)} cells")
+    print(f"Dashboard saved in '{output_folder}/dashboard.html'")
+
+
+DASHBOARD_TEMPLATE = r"""<!DOCTYPE html>
+<html lang="ro">
+<head>
+<meta charset="utf-8">
+<title>Propaganda electorala - explorare</title>
+<style>
+  body { font-family: sans-serif; margin: 2em; color: #222; }
+  .filters { display: flex; flex-wrap: wrap; gap: 1em; margin-bottom: 1em; }
+  label { display: flex; flex-direction: column; font-size: 0.85em; }
+  select { min-width: 12em; max-width: 22em; }
+  table { border-collapse: collapse; width: 100%; }
+  th, td { border-bottom: 1px solid #ddd; padding: 4px 8px; text-align: right; }
+  th { cursor: pointer; background: #f4f4f4; }
+  td:first-child, th:first-child { text-align: left; }
+  .bar { background: #3b75af; height: 0.8em; }
+  .note { font-size: 0.85em; color: #666; }
+</style>
+</head>
+<body>
+<h1>Propaganda electorala - cheltuieli si reach</h1>
+<p class="note">O reclama care vizeaza mai multi candidati este numarata o data pentru fiecare candidat.</p>
+<div class="filters" id="filters"></div>
+<div class="filters">
+  <label>Grupare dupa<select id="group-by"></select></label>
+</div>
+<p id="totals"></p>
+<table>
+  <thead><tr id="header"></tr></thead>
+  <tbody id="rows"></tbody>
+</table>
+<script>
+const CUBE = %cube-data%;
+const DIMENSIONS = Object.keys(CUBE.dimensions);
+const MEASURES = Object.keys(CUBE.measures);
+const LABELS = {party: 'Partid', page: 'Pagina', candidate: 'Candidat', impact: 'Impact', hour: 'Ora',
+                ads: 'Reclame', spend: 'Cheltuieli (RON)', impressions: 'Impresii', reach: 'Reach'};
+const filters = {};
+let sortMeasure = 'spend';
+
+function option(value, text) {
+  const element = document.createElement('option');
+  element.value = value;
+  element.textContent = text;
+  return element;
+}
+
+function setup() {
+  const container = document.getElementById('filters');
+  const groupBy = document.getElementById('group-by');
+  for (const dimension of DIMENSIONS) {
+    const label = document.createElement('label');
+    label.textContent = LABELS[dimension];
+    const select = document.createElement('select');
+    select.appendChild(option(-1, '(toate)'));
+    CUBE.dimensions[dimension].values.forEach((value, code) => select.appendChild(option(code, value)));
+    select.addEventListener('change', () => { filters[dimension] = Number(select.value); render(); });
+    label.appendChild(select);
+    container.appendChild(label);
+    filters[dimension] = -1;
+    groupBy.appendChild(option(dimension, LABELS[dimension]));
+  }
+  groupBy.value = 'party';
+  groupBy.addEventListener('change', render);
+}
+
+function render() {
+  const groupBy = document.getElementById('group-by').value;
+  const groups = new Map();
+  const totals = Object.fromEntries(MEASURES.map(measure => [measure, 0]));
+
+  for (let row = 0; row < CUBE.rows; row++) {
+    let keep = true;
+    for (const dimension of DIMENSIONS) {
+      if (filters[dimension] >= 0 && CUBE.dimensions[dimension].codes[row] !== filters[dimension]) {
+        keep = false;
+        break;
+      }
+    }
+    if (!keep) continue;
+
+    const key = CUBE.dimensions[groupBy].codes[row];
+    if (!groups.has(key)) groups.set(key, Object.fromEntries(MEASURES.map(measure => [measure, 0])));
+    const group = groups.get(key);
+    for (const measure of MEASURES) {
+      group[measure] += CUBE.measures[measure][row];
+      totals[measure] += CUBE.measures[measure][row];
+    }
+  }
+
+  const sorted = [...groups.entries()].sort((a, b) => b[1][sortMeasure] - a[1][sortMeasure]);
+  const maximum = sorted.length ? sorted[0][1][sortMeasure] : 0;
+  const format = value => value.toLocaleString('ro-RO', {maximumFractionDigits: 0});
+
+  const header = document.getElementById('header');
+  header.innerHTML = '';
+  for (const column of [groupBy, ...MEASURES, '']) {
+    const cell = document.createElement('th');
+    cell.textContent = LABELS[column] || '';
+    if (MEASURES.includes(column)) {
+      cell.addEventListener('click', () => { sortMeasure = column; render(); });
+      if (column === sortMeasure) cell.textContent += ' ▼';
+    }
+    header.appendChild(cell);
+  }
+
+  const body = document.getElementById('rows');
+  body.innerHTML = '';
+  for (const [key, group] of sorted) {
+    const row = document.createElement('tr');
+    const name = document.createElement('td');
+    name.textContent = CUBE.dimensions[groupBy].values[key];
+    row.appendChild(name);
+    for (const measure of MEASURES) {
+      const cell = document.createElement('td');
+      cell.textContent = format(group[measure]);
+      row.appendChild(cell);
+    }
+    const barCell = document.createElement('td');
+    const bar = document.createElement('div');
+    bar.className = 'bar';
+    bar.style.width = (maximum ? 200 * group[sortMeasure] / maximum : 0) + 'px';
+    barCell.appendChild(bar);
+    row.appendChild(barCell);
+    body.appendChild(row);
+  }
+
+  document.getElementById('totals').textContent =
+    MEASURES.map(measure => `${LABELS[measure]}: ${format(totals[measure])}`).join(' | ');
+}
+
+setup();
+render();
+</script>
+</body>
+</html>
+"""
+
+
+if __name__ == "__main__":
+    main()
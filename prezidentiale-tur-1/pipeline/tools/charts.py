@@ -0,0 +1,152 @@
+import os
+import json
+import hashlib
+import inspect
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import matplotlib
+
+# Render without a display, whatever backend the environment would pick
+matplotlib.use('Agg')
+
+import pandas as pd
+from matplotlib.figure import Figure
+
+CACHE_FILENAME = '.chart_cache.json'
+
+
+@dataclass
+class Chart:
+    """
+    A chart to render: a module-level render function and the (small) aggregate it draws.
+
+    The render function is called as render(figure, data) and must be picklable,
+    so charts can be rendered in worker processes.
+    """
+    filename: str
+    render: Callable[[Figure, Any], None]
+    data: Any
+    figsize: Tuple[float, float] = (6.4, 4.8)
+    dpi: int = 100
+    savefig_kwargs: Dict[str, Any] = field(default_factory=dict)
+
+    def fingerprint(self) -> str:
+        """
+        Hash of everything that affects the image: the aggregate, the render code (with its
+        constants, and the source of its module for the titles and helpers it uses) and the layout
+        """
+        code = self.render.__code__
+        digest = hashlib.sha256()
+        digest.update(self.render.__qualname__.encode('utf-8'))
+        digest.update(code.co_code)
+        digest.update(repr((code.co_consts, code.co_names)).encode('utf-8'))
+        digest.update(_module_source(self.render.__module__).encode('utf-8'))
+        digest.update(repr((self.figsize, self.dpi, sorted(self.savefig_kwargs.items()))).encode('utf-8'))
+        _update_digest(digest, self.data)
+        return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _module_source(module_name: str) -> str:
+    """Source of the module defining a render function, empty when it can't be read"""
+    module = sys.modules.get(module_name)
+    try:
+        return inspect.getsource(module) if module is not None else ''
+    except (OSError, TypeError):
+        return ''
+
+
+def _update_digest(digest, data: Any):
+    """Content hash of an aggregate, stable across processes and runs"""
+    if isinstance(data, (pd.Series, pd.DataFrame)):
+        digest.update(type(data).__name__.encode('utf-8'))
+        digest.update(repr(list(data.columns) if isinstance(data, pd.DataFrame) else data.name).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    elif isinstance(data, dict):
+        for key in sorted(data, key=repr):
+            digest.update(repr(key).encode('utf-8'))
+            _update_digest(digest, data[key])
+    elif isinstance(data, (list, tuple)):
+        digest.update(f'{type(data).__name__}:{len(data)}'.encode('utf-8'))
+        for item in data:
+            _update_digest(digest, item)
+    else:
+        digest.update(pickle.dumps(data))
+
+
+def _render_chart(chart: Chart, output_path: str):
+    """Render a single chart with the object-oriented API (no pyplot global state)"""
+    figure = Figure(figsize=chart.figsize)
+    chart.render(figure, chart.data)
+    figure.savefig(output_path, dpi=chart.dpi, **chart.savefig_kwargs)
+    return output_path
+
+
+def _load_cache(output_folder: str) -> Dict[str, str]:
+    cache_path = os.path.join(output_folder, CACHE_FILENAME)
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(output_folder: str, cache: Dict[str, str]):
+    cache_path = os.path.join(output_folder, CACHE_FILENAME)
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+
+def render_charts(charts: List[Chart], output_folder: str, max_workers: Optional[int] = None,
+                  use_cache: bool = True) -> List[str]:
+    """
+    Render charts into output_folder, skipping the ones whose aggregate didn't change
+    and rendering the rest in a process pool.
+
+    Args:
+        charts: Charts to render
+        output_folder: Directory for the images (and the cache index)
+        max_workers: Worker processes, defaults to one per pending chart up to the CPU count
+        use_cache: Skip charts whose fingerprint matches the last render
+
+    Returns:
+        Paths of the charts that were (re-)rendered
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    cache = _load_cache(output_folder) if use_cache else {}
+
+    pending = []
+    for chart in charts:
+        output_path = os.path.join(output_folder, chart.filename)
+        fingerprint = chart.fingerprint()
+        if use_cache and cache.get(chart.filename) == fingerprint and os.path.exists(output_path):
+            continue
+        pending.append((chart, output_path, fingerprint))
+
+    if max_workers is None:
+        max_workers = min(len(pending), os.cpu_count() or 1)
+
+    # Starting worker processes isn't worth it for a single chart
+    if max_workers <= 1 or len(pending) <= 1:
+        rendered = [_render_chart(chart, output_path) for chart, output_path, _ in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_render_chart, chart, output_path) for chart, output_path, _ in pending]
+            rendered = [future.result() for future in futures]
+
+    for chart, _, fingerprint in pending:
+        cache[chart.filename] = fingerprint
+    _save_cache(output_folder, cache)
+
+    skipped = len(charts) - len(pending)
+    if skipped:
+        print(f"Charts: {len(pending)} rendered, {skipped} unchanged")
+
+    return rendered
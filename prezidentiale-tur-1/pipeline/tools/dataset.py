@@ -0,0 +1,199 @@
+import os
+import json
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+DATASET_JSON_PATH = "final_enriched_meta_ad_data.json"
+DATASET_PARQUET_PATH = "final_enriched_meta_ad_data.parquet"
+
+BOUNDS_COLUMNS = ['impressions', 'spend']
+BOUNDS_FIELDS = ['lower_bound', 'upper_bound', 'average']
+TIMESTAMP_COLUMNS = ['ad_delivery_stop_time']
+
+
+def _nested_types():
+    """Arrow types of the nested columns (pyarrow is only imported when Parquet is used)"""
+    import pyarrow as pa
+
+    bounds = pa.struct([(field, pa.float64()) for field in BOUNDS_FIELDS])
+    return {
+        'impressions': bounds,
+        'spend': bounds,
+        'demographic_distribution': pa.list_(pa.struct([
+            ('age', pa.string()),
+            ('gender', pa.string()),
+            ('percentage', pa.float64()),
+        ])),
+        'delivery_by_region': pa.list_(pa.struct([
+            ('region', pa.string()),
+            ('percentage', pa.float64()),
+        ])),
+    }
+
+
+def ads_table(df: pd.DataFrame):
+    """
+    Convert the ingested ads to an Arrow table, with the bounds as struct columns and the
+    demographic/region distributions as list<struct> columns.
+
+    Args:
+        df: Ingested ads, with the bounds as flat <column>_lower_bound/_upper_bound/_average columns
+
+    Returns:
+        pyarrow.Table in the dataset schema
+    """
+    import pyarrow as pa
+
+    nested_types = _nested_types()
+    flat_bounds = {f'{column}_{field}' for column in BOUNDS_COLUMNS for field in BOUNDS_FIELDS}
+
+    names, arrays = [], []
+    for column in df.columns:
+        if column in flat_bounds:
+            continue
+
+        if column in BOUNDS_COLUMNS:
+            average = df[f'{column}_average']
+            array = pa.StructArray.from_arrays(
+                [pa.array(df[f'{column}_{field}'].to_numpy(), type=pa.float64(), from_pandas=True)
+                 for field in BOUNDS_FIELDS],
+                BOUNDS_FIELDS,
+                mask=pa.array(average.isna().to_numpy())
+            )
+        elif column in nested_types:
+            array = pa.array(df[column].tolist(), type=nested_types[column])
+        elif column in TIMESTAMP_COLUMNS:
+            array = pa.array(df[column], from_pandas=True).cast(pa.timestamp('ms'))
+        else:
+            array = pa.array(df[column], from_pandas=True)
+
+        names.append(column)
+        arrays.append(array)
+
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def write_ads_parquet(df: pd.DataFrame, output_path: str = DATASET_PARQUET_PATH):
+    """Write the ingested ads as the Parquet dataset"""
+    import pyarrow.parquet as pq
+
+    pq.write_table(ads_table(df), output_path, compression='zstd')
+
+
+def append_ads_parquet(df: pd.DataFrame, output_path: str = DATASET_PARQUET_PATH):
+    """Append ingested ads to the Parquet dataset (columnar re-write, the CSVs are not read again)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    existing = pq.read_table(output_path)
+    new = ads_table(df).select(existing.column_names).cast(existing.schema)
+
+    temp_path = f"{output_path}.tmp"
+    pq.write_table(pa.concat_tables([existing, new]), temp_path, compression='zstd')
+    os.replace(temp_path, output_path)
+
+
+def resolve_dataset_path(path: Optional[str] = None) -> str:
+    """Prefer the Parquet dataset when it exists and pyarrow is installed, otherwise use the JSON"""
+    if path:
+        return path
+
+    if os.path.exists(DATASET_PARQUET_PATH):
+        try:
+            import pyarrow  # noqa: F401
+            return DATASET_PARQUET_PATH
+        except ImportError:
+            pass
+
+    return DATASET_JSON_PATH
+
+
+def _read_parquet_table(path: str, columns: Optional[List[str]], exclude: Optional[List[str]]):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if exclude:
+        schema = pq.read_schema(path)
+        columns = [name for name in (columns or schema.names) if name not in exclude]
+
+    # Only the requested columns are read from disk
+    table = pq.read_table(path, columns=columns)
+
+    # Keep the JSON contract: timestamps as epoch milliseconds
+    for name in TIMESTAMP_COLUMNS:
+        if name in table.column_names:
+            index = table.column_names.index(name)
+            table = table.set_column(index, name, table.column(name).cast(pa.timestamp('ms')).cast(pa.int64()))
+
+    return table
+
+
+def read_ad_records(path: Optional[str] = None, columns: Optional[List[str]] = None,
+                    exclude: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Read the enriched ads as a list of records, with only the requested columns.
+
+    Args:
+        path: Parquet or JSON dataset, defaults to the Parquet one when available
+        columns: Columns to read (all when omitted)
+        exclude: Columns to leave out
+
+    Returns:
+        List of ad records, in the same shape as final_enriched_meta_ad_data.json
+    """
+    path = resolve_dataset_path(path)
+
+    if path.endswith('.parquet'):
+        return _read_parquet_table(path, columns, exclude).to_pylist()
+
+    with open(path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    if columns or exclude:
+        keep = [name for name in (columns or (records[0].keys() if records else [])) if name not in (exclude or [])]
+        records = [{name: record.get(name) for name in keep} for record in records]
+
+    return records
+
+
+def read_ads_frame(path: Optional[str] = None, columns: Optional[List[str]] = None,
+                   flatten_bounds: bool = False) -> pd.DataFrame:
+    """
+    Read the enriched ads as a DataFrame, with only the requested columns.
+
+    Args:
+        path: Parquet or JSON dataset, defaults to the Parquet one when available
+        columns: Columns to read (all when omitted)
+        flatten_bounds: Replace the impressions/spend objects with numeric
+            <column>_lower_bound/_upper_bound/_average columns
+
+    Returns:
+        DataFrame of ads
+    """
+    path = resolve_dataset_path(path)
+
+    if path.endswith('.parquet'):
+        table = _read_parquet_table(path, columns, None)
+        if not flatten_bounds:
+            return table.to_pandas()
+
+        # Struct fields become plain float columns, no Python dicts are ever built
+        df = table.flatten().to_pandas()
+        return df.rename(columns=lambda name: name.replace('.', '_'))
+
+    records = read_ad_records(path, columns)
+    if not flatten_bounds:
+        return pd.DataFrame(records)
+
+    df = pd.json_normalize(records, sep='_')
+    for column in BOUNDS_COLUMNS:
+        if columns and column not in columns:
+            continue
+        for field in BOUNDS_FIELDS:
+            flat_column = f'{column}_{field}'
+            df[flat_column] = pd.to_numeric(df[flat_column], errors='coerce') if flat_column in df else float('nan')
+        # Ads without bounds keep a null column under the original name
+        df = df.drop(columns=[column], errors='ignore')
+
+    return df
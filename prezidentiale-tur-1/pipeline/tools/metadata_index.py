@@ -0,0 +1,92 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from tools.dataset import BOUNDS_COLUMNS, BOUNDS_FIELDS, TIMESTAMP_COLUMNS, read_ads_frame
+
+
+class AdMetadataIndex:
+    """
+    Read-only ad metadata keyed by ad_archive_id, stored column-wise in numpy arrays:
+    sorted int64 ids, float64 bounds, int64 timestamps and dictionary-encoded strings.
+
+    No per-ad Python objects are kept; a record is only built (as a plain dict, in the
+    dataset's shape) when it is looked up, so it is a drop-in for the dict of records.
+    """
+
+    __slots__ = ('columns', '_ids', '_bounds', '_timestamps', '_strings')
+
+    def __init__(self, df: pd.DataFrame, columns: List[str]):
+        """
+        Args:
+            df: Ads read with flatten_bounds=True
+            columns: Original dataset columns to keep (ad_archive_id included)
+        """
+        self.columns = [column for column in columns if column != 'ad_archive_id']
+
+        # Last occurrence wins, as with the dict it replaces
+        ids = pd.to_numeric(df['ad_archive_id'], errors='coerce')
+        df = df[ids.notna().to_numpy()].assign(ad_archive_id=ids.dropna().astype('int64'))
+        df = df.drop_duplicates('ad_archive_id', keep='last').sort_values('ad_archive_id')
+        self._ids = df['ad_archive_id'].to_numpy(dtype='int64')
+
+        self._bounds, self._timestamps, self._strings = {}, {}, {}
+        for column in self.columns:
+            if column in BOUNDS_COLUMNS:
+                fields = np.column_stack([
+                    pd.to_numeric(df[f'{column}_{field}'], errors='coerce').to_numpy(dtype='float64')
+                    if f'{column}_{field}' in df else np.full(len(df), np.nan)
+                    for field in BOUNDS_FIELDS
+                ])
+                self._bounds[column] = (fields, np.isnan(fields[:, BOUNDS_FIELDS.index('average')]))
+            elif column in TIMESTAMP_COLUMNS:
+                values = pd.to_numeric(df[column], errors='coerce') if column in df \
+                    else pd.Series(np.nan, index=df.index)
+                self._timestamps[column] = (values.fillna(0).to_numpy(dtype='int64'), values.isna().to_numpy())
+            else:
+                # Few distinct values (audience ranges, currencies, dates): store codes into a table
+                values = df[column] if column in df else pd.Series(None, index=df.index, dtype=object)
+                codes, values = pd.factorize(values)
+                self._strings[column] = (codes.astype('int32'), list(values))
+
+    @classmethod
+    def from_dataset(cls, path: Optional[str], columns: List[str]) -> 'AdMetadataIndex':
+        """Build the index from the Parquet or JSON dataset, reading only the given columns"""
+        return cls(read_ads_frame(path, columns=columns, flatten_bounds=True), columns)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _position(self, ad_id: Any) -> Optional[int]:
+        try:
+            ad_id = int(ad_id)
+        except (TypeError, ValueError):
+            return None
+
+        position = int(np.searchsorted(self._ids, ad_id))
+        if position < len(self._ids) and self._ids[position] == ad_id:
+            return position
+        return None
+
+    def __contains__(self, ad_id: Any) -> bool:
+        return self._position(ad_id) is not None
+
+    def get(self, ad_id: Any, default: Any = None) -> Optional[Dict[str, Any]]:
+        """The record of an ad (only the indexed columns), or default when it isn't indexed"""
+        position = self._position(ad_id)
+        if position is None:
+            return default
+
+        record = {'ad_archive_id': int(self._ids[position])}
+        for column in self.columns:
+            if column in self._bounds:
+                fields, missing = self._bounds[column]
+                record[column] = None if missing[position] else dict(zip(BOUNDS_FIELDS, fields[position].tolist()))
+            elif column in self._timestamps:
+                values, missing = self._timestamps[column]
+                record[column] = None if missing[position] else int(values[position])
+            else:
+                codes, values = self._strings[column]
+                record[column] = values[codes[position]] if codes[position] >= 0 else None
+        return record
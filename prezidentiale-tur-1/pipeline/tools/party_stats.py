@@ -0,0 +1,63 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CONFIDENCE = 0.95
+
+
+def wilson_interval(successes: pd.Series, totals: pd.Series, confidence: float = DEFAULT_CONFIDENCE):
+    """
+    Wilson score interval of a proportion, element-wise.
+
+    Unlike the normal approximation it stays within [0, 1] and is usable for the
+    small per-party samples (a handful of verdicts, or proportions of 0 or 1).
+
+    Returns:
+        (lower, upper) Series, NaN where the total is 0
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    n = totals.astype('float64').where(totals > 0)
+    p = successes / n
+
+    denominator = 1 + z ** 2 / n
+    center = (p + z ** 2 / (2 * n)) / denominator
+    half_width = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denominator
+    return (center - half_width).clip(lower=0), (center + half_width).clip(upper=1)
+
+
+def party_precision_stats(df: pd.DataFrame, party_column: str = 'party', flag_column: str = 'is_propaganda',
+                          reach_column: str = 'reach', confidence: float = DEFAULT_CONFIDENCE) -> pd.DataFrame:
+    """
+    Per-party verdict statistics, in a single groupby pass.
+
+    Args:
+        df: One row per graded ad, confirmed violations and false positives together
+        party_column: Column with the responsible party
+        flag_column: Boolean column, True for confirmed violations
+        reach_column: Numeric reach column (summed over the confirmed violations)
+        confidence: Confidence level of the precision interval
+
+    Returns:
+        DataFrame indexed by party (in order of first appearance) with total, violations,
+        false_positives, reach, precision, precision_low, precision_high and fp_rate (%)
+    """
+    flags = df[flag_column].astype(bool)
+    stats = df.assign(
+        _violation=flags.astype('int64'),
+        _violation_reach=df[reach_column].where(flags, 0)
+    ).groupby(party_column, sort=False).agg(
+        total=('_violation', 'size'),
+        violations=('_violation', 'sum'),
+        reach=('_violation_reach', 'sum')
+    )
+    stats.index.name = party_column
+
+    stats['false_positives'] = stats['total'] - stats['violations']
+    stats['precision'] = stats['violations'] / stats['total']
+    stats['precision_low'], stats['precision_high'] = wilson_interval(stats['violations'], stats['total'],
+                                                                      confidence)
+    stats['fp_rate'] = (stats['false_positives'] / stats['total'] * 100).round(2)
+
+    return stats[['total', 'violations', 'false_positives', 'reach',
+                  'precision', 'precision_low', 'precision_high', 'fp_rate']]
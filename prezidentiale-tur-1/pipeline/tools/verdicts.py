@@ -0,0 +1,98 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+VERDICT_FIELDS = ['post_id', 'electoral-propaganda-decision', 'responsible-party-or-group']
+
+# Any of the conclusion fields, or a whole candidate block
+VERDICT_PATTERN = re.compile(
+    r'<(' + '|'.join(VERDICT_FIELDS) + r')>(.*?)</\1>'
+    r'|<candidate>\s*<name>(.*?)</name>\s*<impact>(.*?)</impact>\s*</candidate>'
+)
+FENCE_PATTERN = re.compile(r'```(?:xml)?\s*\n(.*?)```', re.DOTALL)
+
+
+class PartyNormalizer:
+    @staticmethod
+    def normalize_party_name(name: str) -> str:
+        """
+        Normalize party name by:
+        1. Converting to uppercase
+        2. Removing diacritics
+        3. Removing special characters
+        4. Normalizing spaces
+        """
+        # Convert to uppercase
+        name = name.upper()
+
+        # Remove diacritics
+        name = unicodedata.normalize('NFKD', name).encode('ASCII', 'ignore').decode('ASCII')
+
+        # Remove special characters and normalize spaces
+        name = re.sub(r'[^\w\s]', '', name)
+        name = ' '.join(name.split())
+
+        return name
+
+
+@lru_cache(maxsize=None)
+def normalize_party(name: str) -> str:
+    """PartyNormalizer.normalize_party_name, memoized (the same few parties repeat across verdicts)"""
+    return PartyNormalizer.normalize_party_name(name)
+
+
+def _output_span(text: str) -> Optional[Tuple[int, int]]:
+    """Bounds of the <output> block, or of the first fenced block when the tags were fenced without it"""
+    start = text.find('<output>')
+    if start != -1:
+        end = text.find('</output>', start)
+        return (start + len('<output>'), end) if end != -1 else None
+
+    fence = FENCE_PATTERN.search(text)
+    return fence.span(1) if fence else None
+
+
+def extract_verdict(text: str) -> Optional[Dict]:
+    """
+    Extract the conclusion of an AI verdict (post_id, responsible party, decision and,
+    for propaganda, the affected candidates) in a single pass over the conclusion.
+
+    Returns:
+        Dict with post_id, responsible_party, is_propaganda and candidates, or None
+        when the verdict has no complete conclusion
+    """
+    output_span = _output_span(text)
+    if not output_span:
+        return None
+
+    conclusion_start = text.find('<conclusion>', *output_span)
+    if conclusion_start == -1:
+        return None
+    conclusion_start += len('<conclusion>')
+    conclusion_end = text.find('</conclusion>', conclusion_start, output_span[1])
+    if conclusion_end == -1:
+        return None
+
+    # One scan collects the first occurrence of each field and every candidate
+    fields = {}
+    candidates = []
+    for match in VERDICT_PATTERN.finditer(text, conclusion_start, conclusion_end):
+        tag = match.group(1)
+        if tag is None:
+            candidates.append({'name': match.group(3).strip(), 'impact': match.group(4).strip()})
+        elif tag not in fields:
+            fields[tag] = match.group(2).strip()
+
+    if len(fields) < len(VERDICT_FIELDS):
+        return None
+
+    # Track both TRUE and FALSE cases, candidates only matter for TRUE
+    is_propaganda = fields['electoral-propaganda-decision'] == 'TRUE'
+
+    return {
+        'post_id': fields['post_id'],
+        'responsible_party': normalize_party(fields['responsible-party-or-group']),
+        'is_propaganda': is_propaganda,
+        'candidates': candidates if is_propaganda else []
+    }
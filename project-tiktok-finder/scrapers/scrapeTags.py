@@ -2,6 +2,7 @@ import random
 
 from TikTokApi import TikTokApi
 import asyncio
+import itertools
 import os
 import json
 from datetime import datetime
@@ -10,132 +11,634 @@ import traceback
 from dotenv import load_dotenv
 import time
 import aiohttp
-from typing import List
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
 
+from tools.comment_harvester import CommentHarvester
 from tools.cookies import get_cookies
+from tools.media_queue import MediaDownloader, TokenBucket, load_flagged_ids
+from tools.metrics import PipelineMetrics
 from tools.proxies import get_proxies
+from tools.seen_index import NEW, REFRESH, SKIP, SeenVideoIndex
+from tools.subtitle_index import SubtitleIndex
+from tools.video_store import VideoStore
 
 load_dotenv()
 
 VIDEOS_PER_TAG = 30
 SLEEP_BETWEEN_TAGS = 1
 TAG_FILE_PATH = "scrapers/tags.txt"
-BATCH_SIZE = 5  # Number of videos to process in parallel
+VIDEO_WORKERS = 5  # Videos of one hashtag processed at the same time
+VIDEO_QUEUE_SIZE = 20  # Videos buffered ahead of the workers, the hashtag feed waits when full
+MAX_CONCURRENT_SAVES = 10  # Videos being saved at the same time, over all hashtags
 MAX_RETRIES = 3
 RETRY_DELAYS = [5, 10, 20]  # Seconds between retries
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+REVALIDATE_EXISTING = False  # Re-check files already downloaded (If-None-Match) instead of skipping them
+NUM_SESSIONS = 3
+CONCURRENT_TAGS = 3  # Hashtags crawled at the same time, spread over the sessions
+TAG_DELAY_RANGE = (1, 3)  # Seconds a session rests between two hashtags
+TAG_STATS_PATH = "scrapers/data/tag_stats.json"
+VIDEOS_DIR = "./videos"
+SEEN_INDEX_PATH = "scrapers/data/seen_videos.json"
+SAVED_VIDEO_FILES = ["subtitles.vtt", "thumbnail.jpg"]  # A video folder missing one of these is saved again
+STATS_REFRESH_AFTER = 12 * 3600  # Seconds before the views/likes of a saved video are refreshed
+STATS_FIELDS = ['stats', 'statsV2', 'authorStats']
+METADATA_STORAGE = 'json'  # 'json' (videos/<id>/video_info.json), 'sqlite' (VIDEO_STORE_PATH) or 'both'
+VIDEO_STORE_PATH = "videos/videos.sqlite"
+INDEX_SUBTITLES = True  # Add the subtitles of saved videos to the full-text index (see searchSubtitles.py)
+SUBTITLE_INDEX_PATH = "videos/subtitles.sqlite"
+
+# Cheap filters applied to the feed, before any comments or download request
+CREATED_AFTER = 1732942800  # Nov 30, 2024
+CAPTION_LANGUAGE = 'ron-RO'
+AUTHOR_ALLOWLIST = []  # uniqueIds, when set only these authors are kept
+AUTHOR_BLOCKLIST = []  # uniqueIds never kept
+MIN_VIEWS = 0
+STOP_AFTER_OLD_VIDEOS = 10  # Consecutive videos older than CREATED_AFTER after which a hashtag feed is dropped
+
+# Video (MP4) downloads, off by default, in their own queue next to the crawl
+DOWNLOAD_MEDIA = False
+MEDIA_FILENAME = "video.mp4"
+MEDIA_WORKERS = 2
+MEDIA_BYTES_PER_SECOND = 2 * 1024 * 1024  # Over all media downloads
+MEDIA_DISK_QUOTA = 20 * 1024 ** 3  # Bytes of MP4s under VIDEOS_DIR after which no more are downloaded
+MEDIA_DRAIN_TIMEOUT = 600  # Seconds the queued media may take to finish once the crawl is done
+AI_ANALYSIS_DIR = "ai/analysis"  # Verdicts (video_<id>.xml) whose flagged videos are downloaded first
+
+# Comments, fetched in the background once a video is saved or its stats refreshed
+COMMENTS_PER_VIDEO = 100  # New comments fetched at most per video and harvest (TikTok returns them 20 per page)
+COMMENTS_CREATED_AFTER = CREATED_AFTER  # Older comments are never kept
+COMMENT_STOP_AFTER_OLD = 20  # Consecutive comments already collected (or too old) after which paging stops
+COMMENT_WORKERS = 4
+COMMENT_DRAIN_TIMEOUT = 300  # Seconds the queued comments may take to finish once the crawl is done
+
+
+async def _write_stream(response: aiohttp.ClientResponse, path: str, mode: str,
+                        limiter: Optional[TokenBucket] = None):
+    """Stream the body to path chunk by chunk, the file I/O running off the event loop"""
+    f = await asyncio.to_thread(open, path, mode)
+    try:
+        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+            if limiter is not None:
+                await limiter.consume(len(chunk))
+            await asyncio.to_thread(f.write, chunk)
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+def _discard_part(part_path: str):
+    for path in (part_path, f"{part_path}.validator"):
+        if os.path.exists(path):
+            os.remove(path)
 
 
-async def download_file(url: str, output_path: str, session: aiohttp.ClientSession, retry=0):
+def _range_start(content_range: Optional[str]) -> Optional[int]:
+    """First byte of a 'bytes <start>-<end>/<size>' Content-Range, None if unparsable"""
     try:
-        async with session.get(url) as response:
-            if response.status == 200:
-                content = await response.read()
-                with open(output_path, 'wb') as f:
-                    f.write(content)
-                return True
-            elif response.status != 200 and retry < MAX_RETRIES:
-                delay = RETRY_DELAYS[retry]
-                print(f"Download failed with status {response.status}. Retrying in {delay}s...")
-                await asyncio.sleep(delay)
-                return await download_file(url, output_path, session, retry + 1)
-    except Exception as e:
-        if retry < MAX_RETRIES:
-            delay = RETRY_DELAYS[retry]
-            print(f"Error downloading {url}: {e}. Retrying in {delay}s...")
+        return int(content_range.split()[1].split('-')[0])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _response_validator(response: aiohttp.ClientResponse) -> Optional[str]:
+    """Value If-Range can resume this response with: a strong ETag, else Last-Modified"""
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+async def download_file(url: str, output_path: str, session: aiohttp.ClientSession,
+                        headers: Optional[Dict[str, str]] = None, limiter: Optional[TokenBucket] = None,
+                        reserve: Optional[Callable[[int], bool]] = None) -> bool:
+    """
+    Download url to output_path, streamed to a .part file then renamed into place, so
+    output_path is never left half written.
+
+    An existing output_path is kept as is, or revalidated with If-None-Match against its
+    stored ETag (output_path.etag) when REVALIDATE_EXISTING is set. A failed attempt keeps
+    the .part file with the validator (strong ETag or Last-Modified) of its response, and
+    the retry asks only for the missing bytes (Range + If-Range), starting over when the
+    server sends the whole body or another range. A .part file without a validator can't
+    be matched to the resource and is discarded. A limiter caps the bandwidth, and reserve
+    is given the size of the complete file before anything is written, the download
+    stopping (its .part file kept) when it returns False.
+    """
+    part_path = f"{output_path}.part"
+    part_validator_path = f"{part_path}.validator"
+    etag_path = f"{output_path}.etag"
+
+    etag = None
+    if os.path.exists(output_path):
+        if not REVALIDATE_EXISTING or not os.path.exists(etag_path):
+            return True
+        with open(etag_path, 'r', encoding='utf-8') as f:
+            etag = f.read().strip()
+
+    for attempt in range(MAX_RETRIES + 1):
+        request_headers = dict(headers or {})
+        if etag:
+            request_headers['If-None-Match'] = etag
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        validator = None
+        if offset and os.path.exists(part_validator_path):
+            with open(part_validator_path, 'r', encoding='utf-8') as f:
+                validator = f.read().strip()
+        if offset and not validator:
+            _discard_part(part_path)
+            offset = 0
+        if offset:
+            request_headers['Range'] = f"bytes={offset}-"
+            request_headers['If-Range'] = validator
+
+        try:
+            async with session.get(url, headers=request_headers) as response:
+                if response.status == 304:
+                    return True
+                if response.status == 416:
+                    # The partial file doesn't match the resource any more, start over
+                    _discard_part(part_path)
+                    error = "range not satisfiable"
+                elif response.status == 206 and _range_start(response.headers.get('Content-Range')) != offset:
+                    _discard_part(part_path)
+                    error = f"unexpected Content-Range {response.headers.get('Content-Range')}"
+                elif response.status in (200, 206):
+                    if reserve is not None and response.content_length is not None:
+                        size = response.content_length + (offset if response.status == 206 else 0)
+                        if not reserve(size):
+                            print(f"Not downloading {url}: {size} bytes would exceed the disk quota")
+                            return False
+                    if response.status == 200:
+                        # The whole body (no Range, or If-Range found the resource changed)
+                        validator = _response_validator(response)
+                        if validator:
+                            with open(part_validator_path, 'w', encoding='utf-8') as f:
+                                f.write(validator)
+                        elif os.path.exists(part_validator_path):
+                            os.remove(part_validator_path)
+                    await _write_stream(response, part_path, 'ab' if response.status == 206 else 'wb', limiter)
+                    await asyncio.to_thread(os.replace, part_path, output_path)
+                    if os.path.exists(part_validator_path):
+                        os.remove(part_validator_path)
+                    if response.headers.get('ETag'):
+                        with open(etag_path, 'w', encoding='utf-8') as f:
+                            f.write(response.headers['ETag'])
+                    return True
+                else:
+                    error = f"status {response.status}"
+        except Exception as e:
+            error = str(e)
+
+        if attempt < MAX_RETRIES:
+            delay = RETRY_DELAYS[attempt]
+            print(f"Download of {url} failed ({error}). Retrying in {delay}s...")
             await asyncio.sleep(delay)
-            return await download_file(url, output_path, session, retry + 1)
-        print(f"Max retries reached for {url}: {e}")
+
+    print(f"Max retries reached for {url}: {error}")
     return False
 
 
-async def fetch_comments(api: TikTokApi, video_id: str):
+async def fetch_comments(api: TikTokApi, video_id: str, session_index: Optional[int] = None,
+                         count: int = COMMENTS_PER_VIDEO, created_after: int = COMMENTS_CREATED_AFTER):
+    """
+    Up to count comments of a video made after created_after (the newest comment already
+    collected, see comments_high_water). Comments are paged by relevance rather than date,
+    so paging stops once COMMENT_STOP_AFTER_OLD older ones come in a row (breaking out of
+    the iterator requests no further page).
+    """
     comments = []
+    old_streak = 0
     try:
         video = api.video(id=video_id)
-        async for comment in video.comments(count=10):
-            comments.append(comment.as_dict)
+        async for comment in video.comments(count=count, session_index=session_index):
+            comment_dict = comment.as_dict
+            if int(comment_dict.get('create_time') or 0) < created_after:
+                old_streak += 1
+                if old_streak >= COMMENT_STOP_AFTER_OLD:
+                    break
+                continue
+            old_streak = 0
+            comments.append(comment_dict)
+            if len(comments) >= count:
+                break
     except Exception as e:
         print(f"Error fetching comments for video {video_id}: {e}")
     return comments
 
 
-async def save_video_data(video_data: dict, api: TikTokApi, session: aiohttp.ClientSession):
-    video_id = video_data['id']
+def comments_high_water(comments: List[dict]) -> int:
+    """Creation time of the newest comment collected, COMMENTS_CREATED_AFTER at least"""
+    return max([COMMENTS_CREATED_AFTER] + [int(comment.get('create_time') or 0) for comment in comments])
+
 
-    if not ('claInfo' in video_data['video'] and
-            video_data['video']['claInfo'].get('captionInfos') and
-            any(cap.get('language') == 'ron-RO' for cap in video_data['video']['claInfo']['captionInfos'])):
+def store_comments(video_id: str, comments: List[dict]) -> bool:
+    """Merge the fetched comments into the saved record of a video (by cid, the fetched copy wins)"""
+    video_data = read_video_info(video_id)
+    if video_data is None:
         return False
+    merged = {comment.get('cid'): comment for comment in video_data.get('comments') or []}
+    merged.update((comment.get('cid'), comment) for comment in comments)
+    video_data['comments'] = list(merged.values())
+    write_video_info(video_data)
+    return True
+
+
+def create_comment_harvester(api: TikTokApi, metrics: PipelineMetrics) -> CommentHarvester:
+    """
+    Comment queue fetching through fetch_comments, over every session of api, each video
+    paged only down to the comments collected by its previous harvest
+    """
+    async def fetch(video_id: str, session_index: int) -> List[dict]:
+        collected = (read_video_info(video_id) or {}).get('comments') or []
+        return await fetch_comments(api, video_id, session_index, created_after=comments_high_water(collected))
 
-    # Drop any before '1732942800' timestamp - Nov 30, 2024
-    if video_data['createTime'] < 1732942800:
+    num_sessions = max(len(getattr(api, 'sessions', [])), 1)
+    return CommentHarvester(fetch, store_comments, COMMENT_WORKERS, num_sessions, metrics)
+
+
+def romanian_caption(video_data: dict) -> Optional[dict]:
+    caption_infos = video_data.get('video', {}).get('claInfo', {}).get('captionInfos') or []
+    return next((cap for cap in caption_infos if cap.get('language') == CAPTION_LANGUAGE), None)
+
+
+def rejection_reason(video_data: dict) -> Optional[str]:
+    """
+    Why a video from the feed is not kept, None when it is. Only looks at the feed
+    item itself, cheapest checks first, so nothing is requested for rejected videos.
+    """
+    if int(video_data.get('createTime', 0)) < CREATED_AFTER:
+        return 'too_old'
+    if romanian_caption(video_data) is None:
+        return 'no_romanian_caption'
+
+    author = video_data.get('author', {}).get('uniqueId')
+    if AUTHOR_ALLOWLIST and author not in AUTHOR_ALLOWLIST:
+        return 'author_not_allowed'
+    if author in AUTHOR_BLOCKLIST:
+        return 'author_blocked'
+
+    if MIN_VIEWS and int(video_data.get('stats', {}).get('playCount', 0)) < MIN_VIEWS:
+        return 'too_few_views'
+    return None
+
+
+def media_url(video_data: dict) -> Optional[str]:
+    return video_data.get('video', {}).get('playAddr') or video_data.get('video', {}).get('downloadAddr')
+
+
+def create_media_downloader(api: TikTokApi, session: aiohttp.ClientSession, cookies: Dict[str, str],
+                            metrics: PipelineMetrics) -> MediaDownloader:
+    """
+    Media queue downloading through download_file, with the referer and cookies the
+    TikTok CDN checks. Flagged videos saved earlier without their MP4 are queued first,
+    their media URL (signed, long expired) fetched again through api when downloaded.
+    """
+    headers = {
+        'Referer': 'https://www.tiktok.com/',
+        'Cookie': '; '.join(f"{name}={value}" for name, value in cookies.items())
+    }
+    sessions = itertools.cycle(range(max(len(getattr(api, 'sessions', [])), 1)))
+
+    async def download(url: str, output_path: str, **kwargs) -> bool:
+        return await download_file(url, output_path, session, **kwargs)
+
+    async def resolve(video_id: str) -> Optional[str]:
+        author = ((read_video_info(video_id) or {}).get('author') or {}).get('uniqueId', '')
+        try:
+            video = api.video(url=f"https://www.tiktok.com/@{author}/video/{video_id}")
+            return media_url(await video.info(session_index=next(sessions)))
+        except Exception as e:
+            print(f"Error resolving the media URL of video {video_id}: {e}")
+            return None
+
+    flagged_ids = load_flagged_ids(AI_ANALYSIS_DIR)
+    media = MediaDownloader(download, VIDEOS_DIR, MEDIA_FILENAME, MEDIA_BYTES_PER_SECOND, MEDIA_DISK_QUOTA,
+                            MEDIA_WORKERS, flagged_ids, headers, metrics, resolve)
+
+    for video_id in sorted(flagged_ids):
+        if (pathlib.Path(VIDEOS_DIR) / video_id / MEDIA_FILENAME).exists():
+            continue
+        if read_video_info(video_id) is not None:
+            media.enqueue(video_id)
+
+    print(f"Media downloads: {len(flagged_ids)} flagged videos, {media.queue.qsize()} queued from earlier runs, "
+          f"{media.disk_used / 1024 ** 3:.1f}/{MEDIA_DISK_QUOTA / 1024 ** 3:.0f}GB used")
+    return media
+
+
+@lru_cache(maxsize=None)
+def video_store() -> VideoStore:
+    return VideoStore(VIDEO_STORE_PATH)
+
+
+@lru_cache(maxsize=None)
+def subtitle_index() -> SubtitleIndex:
+    return SubtitleIndex(SUBTITLE_INDEX_PATH)
+
+
+def write_video_info(video_data: dict):
+    """Write a video record according to METADATA_STORAGE"""
+    if METADATA_STORAGE in ('sqlite', 'both'):
+        video_store().put(video_data)
+
+    if METADATA_STORAGE in ('json', 'both'):
+        info_path = pathlib.Path(VIDEOS_DIR) / video_data['id'] / "video_info.json"
+        info_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = info_path.with_suffix('.json.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(video_data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, info_path)
+
+
+def read_video_info(video_id: str) -> Optional[dict]:
+    """A saved video record, from the store or from its video_info.json, None if missing"""
+    if METADATA_STORAGE in ('sqlite', 'both'):
+        video_data = video_store().get(video_id)
+        if video_data is not None or METADATA_STORAGE == 'sqlite':
+            return video_data
+
+    try:
+        with open(pathlib.Path(VIDEOS_DIR) / video_id / "video_info.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+async def save_video_data(video_data: dict, api: TikTokApi, session: aiohttp.ClientSession,
+                          session_index: Optional[int] = None, metrics: Optional[PipelineMetrics] = None,
+                          media: Optional[MediaDownloader] = None,
+                          harvester: Optional[CommentHarvester] = None):
+    metrics = metrics if metrics is not None else PipelineMetrics()
+    video_id = video_data['id']
+
+    if rejection_reason(video_data):
         return False
 
-    rom_caption = next(cap for cap in video_data['video']['claInfo']['captionInfos']
-                       if cap.get('language') == 'ron-RO')
-    subtitle_url = rom_caption['url']
+    subtitle_url = romanian_caption(video_data)['url']
 
-    video_dir = pathlib.Path(f"./videos/{video_id}")
+    video_dir = pathlib.Path(VIDEOS_DIR) / video_id
     video_dir.mkdir(parents=True, exist_ok=True)
 
-    # Fetch and add comments to video data
-    comments = await fetch_comments(api, video_id)
-    video_data['comments'] = comments
+    # Comments are added to the saved video info by the harvester, or fetched here without one
+    if harvester is None:
+        with metrics.timed('comments'):
+            video_data['comments'] = await fetch_comments(api, video_id, session_index)
+    else:
+        # Saving a video again keeps the comments harvested for it so far
+        saved_comments = (read_video_info(video_id) or {}).get('comments')
+        if saved_comments:
+            video_data['comments'] = saved_comments
 
-    # Save video info with comments
-    info_path = video_dir / "video_info.json"
-    with open(info_path, 'w', encoding='utf-8') as f:
-        json.dump(video_data, f, indent=2, ensure_ascii=False)
+    write_video_info(video_data)
+    if harvester is not None:
+        harvester.enqueue(video_id)
+
+    if media is not None:
+        media.enqueue(video_id, media_url(video_data))
 
     subtitle_path = video_dir / "subtitles.vtt"
-    if not await download_file(subtitle_url, str(subtitle_path), session):
-        False
+    with metrics.timed('subtitles'):
+        subtitles_saved = await download_file(subtitle_url, str(subtitle_path), session)
+    if not subtitles_saved:
+        print(f"Failed to download subtitles for video {video_id}")
+        return False
+    if INDEX_SUBTITLES:
+        with metrics.timed('subtitle_index'):
+            await asyncio.to_thread(subtitle_index().add_video, video_id, str(subtitle_path))
 
     print(f"Downloaded Romanian subtitles for video {video_id}")
 
     thumbnail_path = video_dir / "thumbnail.jpg"
 
-    if not await download_file(video_data['video']['cover'], str(thumbnail_path), session):
-        print(f"Downloaded thumbnail for video {video_id}")
+    with metrics.timed('thumbnail'):
+        if not await download_file(video_data['video']['cover'], str(thumbnail_path), session):
+            print(f"Failed to download thumbnail for video {video_id}")
+            return False
+
+    return True
+
+
+def refresh_video_stats(video_data: dict) -> bool:
+    """Update only the stats (views, likes...) of a saved video, media and comments untouched"""
+    saved_data = read_video_info(video_data['id'])
+    if saved_data is None:
+        print(f"Error refreshing stats of video {video_data['id']}: not found")
         return False
 
+    for field in STATS_FIELDS:
+        if field in video_data:
+            saved_data[field] = video_data[field]
+
+    write_video_info(saved_data)
     return True
 
 
-async def process_hashtag(api: TikTokApi, tag: str, session: aiohttp.ClientSession):
+async def process_hashtag(api: TikTokApi, tag: str, session: aiohttp.ClientSession,
+                          session_index: Optional[int] = None, save_slots: Optional[asyncio.Semaphore] = None,
+                          metrics: Optional[PipelineMetrics] = None,
+                          seen_index: Optional[SeenVideoIndex] = None,
+                          media: Optional[MediaDownloader] = None,
+                          harvester: Optional[CommentHarvester] = None) -> Tuple[int, int]:
+    """
+    Crawl one hashtag through the given TikTokApi session, returns (videos seen, videos saved).
+
+    The hashtag feed is the producer of a bounded queue drained by VIDEO_WORKERS workers,
+    so a slow video (retrying a download) holds up one worker and not the feed or the
+    other videos. save_slots caps the videos being saved at once over all hashtags.
+
+    Videos failing rejection_reason are dropped before anything is requested for them,
+    and the feed is abandoned after STOP_AFTER_OLD_VIDEOS consecutive videos older than
+    CREATED_AFTER. With a seen_index, videos already met in this run or saved with fresh stats are
+    skipped before the queue, and saved videos with stale stats only get their stats
+    refreshed and their new comments harvested (no subtitles or thumbnail).
+    """
+    save_slots = save_slots if save_slots is not None else asyncio.Semaphore(MAX_CONCURRENT_SAVES)
+    metrics = metrics if metrics is not None else PipelineMetrics()
+    queue = asyncio.Queue(maxsize=VIDEO_QUEUE_SIZE)
     video_count = 0
-    current_batch = []
+    seen_count = 0
+    old_streak = 0
 
-    try:
-        hashtag = api.hashtag(name=tag)
-        async for video in hashtag.videos(count=VIDEOS_PER_TAG):
+    async def worker():
+        nonlocal video_count
+        while True:
+            video_dict, queued_at = await queue.get()
             try:
-                video_dict = video.as_dict
-                current_batch.append(video_dict)
-
-                if len(current_batch) >= BATCH_SIZE:
-                    tasks = [save_video_data(v, api, session) for v in current_batch]
-                    results = await asyncio.gather(*tasks)
-                    video_count += sum(1 for r in results if r)
-                    current_batch = []
-                    print(f"Processed {video_count} Romanian videos for #{tag}")
-
+                metrics.record('queue_wait', time.perf_counter() - queued_at)
+                async with save_slots:
+                    with metrics.timed('save_video'):
+                        saved = await save_video_data(video_dict, api, session, session_index, metrics, media,
+                                                      harvester)
+                if saved:
+                    if seen_index is not None:
+                        seen_index.mark_saved(video_dict['id'])
+                    video_count += 1
+                    if video_count % 5 == 0:
+                        print(f"Processed {video_count} Romanian videos for #{tag}")
             except Exception as e:
                 print(f"Error processing video for #{tag}: {e}")
                 traceback.print_exc()
-                continue
-
-        if current_batch:
-            tasks = [save_video_data(v, api, session) for v in current_batch]
-            results = await asyncio.gather(*tasks)
-            video_count += sum(1 for r in results if r)
+            finally:
+                queue.task_done()
 
-    except Exception as e:
-        print(f"Error processing hashtag #{tag}: {e}")
-        traceback.print_exc()
+    workers = [asyncio.create_task(worker()) for _ in range(VIDEO_WORKERS)]
+    try:
+        try:
+            hashtag = api.hashtag(name=tag)
+            async for video in hashtag.videos(count=VIDEOS_PER_TAG, session_index=session_index):
+                try:
+                    video_dict = video.as_dict
+                except Exception as e:
+                    print(f"Error processing video for #{tag}: {e}")
+                    traceback.print_exc()
+                    continue
+
+                seen_count += 1
+                reason = rejection_reason(video_dict)
+                old_streak = old_streak + 1 if reason == 'too_old' else 0
+                if reason:
+                    metrics.count(f'filtered_{reason}')
+                    if old_streak >= STOP_AFTER_OLD_VIDEOS:
+                        print(f"#{tag}: {old_streak} videos in a row older than the cutoff, stopping the feed")
+                        metrics.count('feeds_stopped_early')
+                        metrics.count('feed_videos_not_listed', max(VIDEOS_PER_TAG - seen_count, 0))
+                        break
+                    continue
+
+                if seen_index is not None:
+                    action = seen_index.claim(video_dict['id'])
+                    if action == SKIP:
+                        continue
+                    if action == REFRESH:
+                        if refresh_video_stats(video_dict):
+                            seen_index.mark_saved(video_dict['id'])
+                            if harvester is not None:
+                                harvester.enqueue(video_dict['id'])
+                        continue
+
+                # Waits while the queue is full (the workers are behind)
+                with metrics.timed('enqueue_wait'):
+                    await queue.put((video_dict, time.perf_counter()))
+                metrics.record_queue_depth(queue.qsize())
+
+        except Exception as e:
+            print(f"Error processing hashtag #{tag}: {e}")
+            traceback.print_exc()
+
+        # Videos already queued are still saved
+        await queue.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
 
     print(f"Completed #{tag}: {video_count} Romanian videos")
-    return video_count
+    return seen_count, video_count
+
+
+def load_tag_stats() -> Dict[str, Dict]:
+    """Per-tag totals of the previous runs"""
+    if not os.path.exists(TAG_STATS_PATH):
+        return {}
+    try:
+        with open(TAG_STATS_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_tag_stats(tag_stats: Dict[str, Dict]):
+    os.makedirs(os.path.dirname(TAG_STATS_PATH), exist_ok=True)
+    temp_path = f"{TAG_STATS_PATH}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(tag_stats, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, TAG_STATS_PATH)
+
+
+def prioritize_tags(hashtags: List[str], tag_stats: Dict[str, Dict]) -> List[str]:
+    """
+    Tags never crawled first (in file order), so they get measured, then the others by
+    Romanian videos saved per run, most productive first.
+    """
+    def saved_per_run(tag: str) -> float:
+        stats = tag_stats[tag]
+        return stats['videos_saved'] / max(stats['runs'], 1)
+
+    new_tags = [tag for tag in hashtags if tag not in tag_stats]
+    known_tags = sorted((tag for tag in hashtags if tag in tag_stats), key=saved_per_run, reverse=True)
+    return new_tags + known_tags
+
+
+async def crawl_hashtags(api: TikTokApi, hashtags: List[str], session: aiohttp.ClientSession,
+                         run_stats: Dict[str, Dict], metrics: PipelineMetrics, seen_index: SeenVideoIndex,
+                         media: Optional[MediaDownloader] = None, harvester: Optional[CommentHarvester] = None,
+                         concurrency: int = CONCURRENT_TAGS):
+    """
+    Crawl the hashtags with `concurrency` crawlers, crawler i using TikTokApi session
+    i % sessions. Each session rests TAG_DELAY_RANGE seconds between two hashtags
+    (asyncio.sleep, the other crawlers keep going).
+
+    Stats of each finished tag (videos seen/saved, seconds, videos saved per minute) are
+    added to run_stats as it completes, so an interrupted run keeps them. One semaphore
+    caps the videos being saved at once over all crawlers (MAX_CONCURRENT_SAVES).
+    """
+    queue = asyncio.Queue()
+    save_slots = asyncio.Semaphore(MAX_CONCURRENT_SAVES)
+    for tag in hashtags:
+        queue.put_nowait(tag)
+
+    num_sessions = max(len(getattr(api, 'sessions', [])), 1)
+    session_ready_at = [0.0] * num_sessions
+    loop = asyncio.get_running_loop()
+
+    async def crawler(crawler_index: int):
+        session_index = crawler_index % num_sessions
+        while True:
+            try:
+                tag = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            # Politeness delay of this session only
+            delay = session_ready_at[session_index] - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            position = len(hashtags) - queue.qsize()
+            print(f"\nProcessing hashtag {position}/{len(hashtags)}: #{tag} (session {session_index})")
+            started = time.perf_counter()
+            seen, saved = await process_hashtag(api, tag, session, session_index, save_slots, metrics,
+                                                seen_index, media, harvester)
+            elapsed = time.perf_counter() - started
+
+            run_stats[tag] = {
+                'videos_seen': seen,
+                'videos_saved': saved,
+                'seconds': round(elapsed, 2),
+                'saved_per_minute': round(saved / elapsed * 60, 2) if elapsed else 0.0
+            }
+            session_ready_at[session_index] = loop.time() + random.uniform(*TAG_DELAY_RANGE)
+
+    await asyncio.gather(*(crawler(index) for index in range(concurrency)))
+
+
+def update_tag_stats(tag_stats: Dict[str, Dict], run_stats: Dict[str, Dict]):
+    """Add this run's numbers to the per-tag totals"""
+    for tag, stats in run_stats.items():
+        totals = tag_stats.setdefault(tag, {'runs': 0, 'videos_seen': 0, 'videos_saved': 0, 'seconds': 0.0})
+        totals['runs'] += 1
+        totals['videos_seen'] += stats['videos_seen']
+        totals['videos_saved'] += stats['videos_saved']
+        totals['seconds'] = round(totals['seconds'] + stats['seconds'], 2)
+        totals['last_run'] = stats
+
+
+def print_tag_stats(run_stats: Dict[str, Dict]):
+    print(f"\n{'Tag':<30} {'Seen':>6} {'Saved':>6} {'Seconds':>9} {'Saved/min':>10}")
+    for tag, stats in sorted(run_stats.items(), key=lambda item: item[1]['videos_saved'], reverse=True):
+        print(f"{'#' + tag:<30} {stats['videos_seen']:>6} {stats['videos_saved']:>6} "
+              f"{stats['seconds']:>9.1f} {stats['saved_per_minute']:>10.1f}")
 
 
 async def main_scraper():
@@ -144,33 +647,57 @@ async def main_scraper():
         print("No hashtags found")
         return
 
-    total_videos = 0
+    tag_stats = load_tag_stats()
+    hashtags = prioritize_tags(hashtags, tag_stats)
+    run_stats = {}
+    metrics = PipelineMetrics()
+    stored_ids = video_store().video_ids() if METADATA_STORAGE in ('sqlite', 'both') else []
+    seen_index = SeenVideoIndex(SEEN_INDEX_PATH, VIDEOS_DIR, STATS_REFRESH_AFTER, stored_ids, SAVED_VIDEO_FILES)
+    print(f"Seen index: {len(seen_index)} videos already saved")
 
     try:
         async with TikTokApi() as api:
             cookies = get_cookies()
             await api.create_sessions(
-                num_sessions=3,
+                num_sessions=NUM_SESSIONS,
                 sleep_after=3,
                 cookies=[cookies],
                 #proxies=get_proxies()
             )
 
             async with aiohttp.ClientSession() as session:
-                for i, tag in enumerate(hashtags, 1):
-                    print(f"\nProcessing hashtag {i}/{len(hashtags)}: #{tag}")
-                    video_count = await process_hashtag(api, tag, session)
-                    total_videos += video_count
-
-                    if i < len(hashtags):
-                        delay = random.uniform(1, 3)
-                        time.sleep(delay)
+                media = None
+                if DOWNLOAD_MEDIA:
+                    media = create_media_downloader(api, session, cookies, metrics)
+                    media.start()
+                harvester = create_comment_harvester(api, metrics)
+                harvester.start()
+                try:
+                    await crawl_hashtags(api, hashtags, session, run_stats, metrics, seen_index, media, harvester)
+                finally:
+                    await harvester.close(COMMENT_DRAIN_TIMEOUT)
+                    if media is not None:
+                        await media.close(MEDIA_DRAIN_TIMEOUT)
 
     except Exception as e:
         print(f"Fatal error: {e}")
         traceback.print_exc()
     finally:
-        print(f"\nComplete: {len(hashtags)} hashtags, {total_videos} videos")
+        if run_stats:
+            print_tag_stats(run_stats)
+            update_tag_stats(tag_stats, run_stats)
+            save_tag_stats(tag_stats)
+            metrics.print_summary()
+        seen_index.save()
+        counts = seen_index.counts
+        print(f"Videos: {counts[NEW]} new, {counts[REFRESH]} stats refreshed, "
+              f"{counts[SKIP]} skipped (saved, fresh stats), {counts['duplicate']} met again under another hashtag")
+        if METADATA_STORAGE in ('sqlite', 'both'):
+            video_store().close()
+        if INDEX_SUBTITLES:
+            subtitle_index().close()
+        total_videos = sum(stats['videos_saved'] for stats in run_stats.values())
+        print(f"\nComplete: {len(run_stats)}/{len(hashtags)} hashtags, {total_videos} videos")
 
 
 def main():
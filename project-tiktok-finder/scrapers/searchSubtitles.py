@@ -0,0 +1,95 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from tools.subtitle_index import SubtitleIndex
+
+VIDEOS_DIR = "./videos"
+SUBTITLE_INDEX_PATH = "videos/subtitles.sqlite"
+BENCHMARK_VIDEOS = 100_000
+
+
+def format_ms(ms: int) -> str:
+    minutes, seconds = divmod(ms // 1000, 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def search(terms, within_seconds=None, limit=20):
+    with SubtitleIndex(SUBTITLE_INDEX_PATH) as index:
+        started = time.perf_counter()
+        indexed, removed = index.update(VIDEOS_DIR)
+        if indexed or removed:
+            print(f"Index updated: {indexed} videos indexed, {removed} removed "
+                  f"({time.perf_counter() - started:.2f}s)")
+
+        started = time.perf_counter()
+        results = index.search(terms, within_seconds)
+        elapsed = time.perf_counter() - started
+
+        window = f" within {within_seconds:g}s" if within_seconds is not None else ""
+        print(f"{len(results)} of {len(index)} videos mention {' + '.join(terms)}{window} ({elapsed * 1000:.1f}ms)\n")
+
+        for result in results[:limit]:
+            print(f"https://www.tiktok.com/@/video/{result['video_id']} "
+                  f"[{format_ms(result['start_ms'])}-{format_ms(result['end_ms'])}]")
+            for start_ms, _, text in index.cues(result['video_id'], result['start_ms'], result['end_ms']):
+                print(f"    {format_ms(start_ms)}  {text}")
+
+
+def benchmark(terms, within_seconds=None, videos=BENCHMARK_VIDEOS):
+    """Index the subtitles under VIDEOS_DIR copied up to `videos` videos, then time the query"""
+    sources = [
+        os.path.join(VIDEOS_DIR, name, 'subtitles.vtt') for name in sorted(os.listdir(VIDEOS_DIR))
+        if os.path.exists(os.path.join(VIDEOS_DIR, name, 'subtitles.vtt'))
+    ]
+    if not sources:
+        print("No subtitles to benchmark with")
+        return
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        videos_dir = os.path.join(temp_dir, 'videos')
+        for copy in range(videos):
+            video_dir = os.path.join(videos_dir, f"{copy:09d}")
+            os.makedirs(video_dir)
+            os.link(sources[copy % len(sources)], os.path.join(video_dir, 'subtitles.vtt'))
+
+        with SubtitleIndex(os.path.join(temp_dir, 'subtitles.sqlite')) as index:
+            started = time.perf_counter()
+            index.update(videos_dir)
+            print(f"Indexed {videos} videos in {time.perf_counter() - started:.1f}s "
+                  f"({os.path.getsize(index.db_path) / 1e6:.0f}MB)")
+
+            started = time.perf_counter()
+            index.update(videos_dir)
+            print(f"Incremental update with nothing new: {time.perf_counter() - started:.2f}s")
+
+            timings = []
+            for _ in range(5):
+                started = time.perf_counter()
+                results = index.search(terms, within_seconds)
+                timings.append(time.perf_counter() - started)
+            print(f"Query {' + '.join(terms)}: {len(results)} videos, best of 5 {min(timings) * 1000:.1f}ms")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the subtitles of the scraped videos")
+    parser.add_argument('terms', nargs='+', help="Words that must all appear (diacritics are ignored)")
+    parser.add_argument('--within', type=float, default=None, help="Seconds within which all the words appear")
+    parser.add_argument('--limit', type=int, default=20, help="Videos to print")
+    parser.add_argument('--benchmark', type=int, nargs='?', const=BENCHMARK_VIDEOS, default=None,
+                        help="Time indexing and the query on a corpus of this many videos")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.terms, args.within, args.benchmark)
+    else:
+        search(args.terms, args.within, args.limit)
+
+
+if __name__ == "__main__":
+    main()
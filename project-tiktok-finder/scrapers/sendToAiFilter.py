@@ -0,0 +1,382 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Set
+
+import aiohttp
+
+from tools.mock_model import start_mock_model
+from tools.subtitle_index import parse_vtt
+from tools.video_store import VideoStore
+
+# Constants
+VIDEOS_DIR = "./videos"
+VIDEO_STORE_PATH = "videos/videos.sqlite"
+OUTPUT_PATH = "ai/analysis"
+PROMPTS_DIR = "ai/prompts/grader"
+GENERATE_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash-002:generateContent"
+MAX_CONCURRENT_REQUESTS = 16
+MAX_BATCH_VIDEOS = 4  # Videos graded in one request, bounded by the verdicts fitting in MAX_OUTPUT_TOKENS
+MAX_BATCH_CHARS = 12_000  # Characters of post data packed into one request, a longer post goes alone
+MAX_TRANSCRIPT_CHARS = 20_000
+MAX_OUTPUT_TOKENS = 8192
+MAX_RETRIES = 3
+RETRY_DELAYS = [5, 15, 45]  # Seconds between retries
+REQUEST_TIMEOUT = 300
+ROMANIA_TZ = timezone(timedelta(hours=2))  # EET, the elections ran in winter time
+
+OUTPUT_PATTERN = re.compile(r'<output>.*?</output>', re.DOTALL)
+POST_ID_PATTERN = re.compile(r'<post_id>\s*(\d+)\s*</post_id>')
+
+
+@dataclass
+class ProcessingStats:
+    successful: int = 0
+    failed: int = 0
+    skipped: int = 0
+    requests: int = 0
+
+
+@dataclass
+class Post:
+    video_id: str
+    author: str
+    text: str
+    thumbnail_path: Optional[str]
+
+
+stats = ProcessingStats()
+
+
+def read_prompt(file_path: str) -> str:
+    """Read prompt content from file"""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def verdict_path(video_id: str) -> str:
+    return os.path.join(OUTPUT_PATH, f"video_{video_id}.xml")
+
+
+def pending_videos(videos_dir: str, store_path: str) -> Iterator[Dict]:
+    """video_info records without a verdict yet, from the video store and the video folders"""
+    stored = set()
+    if os.path.exists(store_path):
+        with VideoStore(store_path) as store:
+            stored = set(store.video_ids())
+            pending = [video_id for video_id in sorted(stored) if not os.path.exists(verdict_path(video_id))]
+            stats.skipped += len(stored) - len(pending)
+            for start in range(0, len(pending), 500):
+                yield from store.get_many(pending[start:start + 500]).values()
+
+    if os.path.isdir(videos_dir):
+        for name in sorted(os.listdir(videos_dir)):
+            info_path = os.path.join(videos_dir, name, 'video_info.json')
+            if name in stored or not os.path.exists(info_path):
+                continue
+            if os.path.exists(verdict_path(name)):
+                stats.skipped += 1
+                continue
+            try:
+                with open(info_path, 'r', encoding='utf-8') as f:
+                    yield json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading {info_path}: {e}")
+                stats.failed += 1
+
+
+def format_transcript(vtt_path: str) -> str:
+    """Subtitle cues as '[mm:ss] text' lines, cut at MAX_TRANSCRIPT_CHARS"""
+    if not os.path.exists(vtt_path):
+        return ''
+    with open(vtt_path, 'r', encoding='utf-8') as f:
+        cues = parse_vtt(f.read())
+
+    lines = []
+    length = 0
+    for start_ms, _, text in cues:
+        minutes, seconds = divmod(start_ms // 1000, 60)
+        line = f"[{minutes:02d}:{seconds:02d}] {text}"
+        length += len(line) + 1
+        if length > MAX_TRANSCRIPT_CHARS:
+            lines.append("[...]")
+            break
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def build_post(video_data: Dict, videos_dir: str) -> Post:
+    """The <post> block of a video: its metadata, subtitle transcript and thumbnail"""
+    video_id = str(video_data['id'])
+    video_dir = os.path.join(videos_dir, video_id)
+    author = video_data.get('author') or {}
+    author_stats = video_data.get('authorStats') or {}
+    video_stats = video_data.get('stats') or {}
+    transcript = format_transcript(os.path.join(video_dir, 'subtitles.vtt'))
+
+    info = {
+        'account': {
+            'uniqueId': author.get('uniqueId'),
+            'nickname': author.get('nickname'),
+            'verified': author.get('verified'),
+            'followers': author_stats.get('followerCount'),
+        },
+        'published': datetime.fromtimestamp(int(video_data.get('createTime', 0)), ROMANIA_TZ).strftime(
+            '%d.%m.%Y %H:%M (ora Romaniei)'),
+        'description': video_data.get('desc'),
+        'hashtags': [challenge.get('title') for challenge in video_data.get('challenges') or []],
+        'stats': {field: video_stats.get(field) for field in ('playCount', 'diggCount', 'commentCount', 'shareCount')},
+        'music': (video_data.get('music') or {}).get('title'),
+        'url': f"https://www.tiktok.com/@{author.get('uniqueId', '')}/video/{video_id}",
+    }
+
+    text = f'<post id="{video_id}">\n# Post Info:\n'
+    for key, value in info.items():
+        text += f"## {key}:\n```\n{json.dumps(value, ensure_ascii=False)}\n```\n"
+    text += f"## transcript:\n```\n{transcript}\n```\n</post>\n"
+
+    thumbnail_path = os.path.join(video_dir, 'thumbnail.jpg')
+    return Post(video_id, author.get('uniqueId', ''), text,
+                thumbnail_path if os.path.exists(thumbnail_path) else None)
+
+
+def pack_batches(posts: Iterator[Post]) -> Iterator[List[Post]]:
+    """Group posts into requests of up to MAX_BATCH_VIDEOS posts and MAX_BATCH_CHARS characters"""
+    batch = []
+    size = 0
+    for post in posts:
+        if batch and (len(batch) >= MAX_BATCH_VIDEOS or size + len(post.text) > MAX_BATCH_CHARS):
+            yield batch
+            batch = []
+            size = 0
+        batch.append(post)
+        size += len(post.text)
+    if batch:
+        yield batch
+
+
+def build_payload(batch: List[Post], system_prompt: str, user_prompt_template: str) -> Dict:
+    parts = user_prompt_template.split('%document-data%')
+    if len(parts) != 2:
+        raise ValueError("Template must contain %document-data% placeholder")
+
+    contents = []
+    for post in batch:
+        if post.thumbnail_path:
+            with open(post.thumbnail_path, 'rb') as f:
+                image_data = base64.b64encode(f.read()).decode('ascii')
+            contents.append({
+                "role": "user",
+                "parts": [
+                    {"text": f"Thumbnail of post {post.video_id}:"},
+                    {"inlineData": {"mimeType": "image/jpeg", "data": image_data}}
+                ]
+            })
+    contents.append({
+        "role": "user",
+        "parts": [{"text": parts[0] + ''.join(post.text for post in batch) + parts[1]}]
+    })
+
+    return {
+        "contents": contents,
+        "systemInstruction": {
+            "role": "user",
+            "parts": [{"text": system_prompt}]
+        },
+        "generationConfig": {
+            "temperature": 0,
+            "topK": 40,
+            "topP": 0.95,
+            "maxOutputTokens": MAX_OUTPUT_TOKENS,
+            "responseMimeType": "text/plain"
+        }
+    }
+
+
+async def generate(session: aiohttp.ClientSession, url: str, api_key: str, payload: Dict) -> Optional[str]:
+    """Text of the model response, retried on rate limits, server and network errors"""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            stats.requests += 1
+            async with session.post(url, params={'key': api_key}, json=payload) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return ''.join(
+                        part.get('text', '')
+                        for candidate in result.get('candidates', [])[:1]
+                        for part in candidate.get('content', {}).get('parts', [])
+                    )
+                error = f"HTTP {response.status}: {(await response.text())[:500]}"
+                if response.status != 429 and response.status < 500:
+                    print(f"Request failed, {error.replace(api_key, '***')}")
+                    return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = str(e) or type(e).__name__
+
+        if attempt < MAX_RETRIES:
+            print(f"Request failed ({error.replace(api_key, '***')}), retrying in {RETRY_DELAYS[attempt]}s")
+            await asyncio.sleep(RETRY_DELAYS[attempt])
+    return None
+
+
+def write_verdict(post: Post, output: str):
+    temp_path = f"{verdict_path(post.video_id)}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(f"{output}\n")
+    os.replace(temp_path, verdict_path(post.video_id))
+
+
+class Grader:
+    """
+    Sends the posts to the model in packed batches, MAX_CONCURRENT_REQUESTS at a time.
+
+    Every video gets its own verdict: the police message cites the account, the views and
+    the publication time of the video, so a verdict is never copied to another one.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, url: str, api_key: str, concurrency: int):
+        self.session = session
+        self.url = url
+        self.api_key = api_key
+        self.concurrency = concurrency
+        self.system_prompt = read_prompt(os.path.join(PROMPTS_DIR, 'system-prompt.txt'))
+        self.user_prompt_template = read_prompt(os.path.join(PROMPTS_DIR, 'user-prompt.txt'))
+        self.in_flight: Set[str] = set()  # Ids of the posts sent and not finished yet
+
+    def posts(self, videos: Iterator[Dict]) -> Iterator[Post]:
+        for video_data in videos:
+            try:
+                post = build_post(video_data, VIDEOS_DIR)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error preparing video {video_data.get('id')}: {e}")
+                stats.failed += 1
+                continue
+            self.in_flight.add(post.video_id)
+            yield post
+
+    def finish(self, post: Post, output: Optional[str]):
+        """Record the verdict (or failure) of a post"""
+        self.in_flight.discard(post.video_id)
+        if output is None:
+            stats.failed += 1
+            return
+        write_verdict(post, output)
+        stats.successful += 1
+
+    async def grade(self, batch: List[Post]):
+        try:
+            payload = build_payload(batch, self.system_prompt, self.user_prompt_template)
+            text = await generate(self.session, self.url, self.api_key, payload)
+        except (OSError, ValueError) as e:
+            print(f"Error preparing request for {[post.video_id for post in batch]}: {e}")
+            text = None
+        if text is None:
+            for post in batch:
+                self.finish(post, None)
+            return
+
+        outputs = {}
+        for output in OUTPUT_PATTERN.findall(text):
+            match = POST_ID_PATTERN.search(output)
+            if match:
+                outputs[match.group(1)] = output
+        if len(batch) == 1 and not outputs and OUTPUT_PATTERN.search(text):
+            outputs[batch[0].video_id] = OUTPUT_PATTERN.search(text).group(0)
+
+        missing = [post for post in batch if post.video_id not in outputs]
+        for post in batch:
+            if post.video_id in outputs:
+                self.finish(post, outputs[post.video_id])
+                print(f"Successfully processed video {post.video_id}")
+
+        if len(batch) > 1:
+            # Posts the model skipped in a packed answer get a request of their own
+            for post in missing:
+                await self.grade([post])
+        elif missing:
+            print(f"No verdict in the response for video {missing[0].video_id}")
+            self.finish(missing[0], None)
+
+    async def worker(self, queue: asyncio.Queue):
+        while True:
+            batch = await queue.get()
+            try:
+                await self.grade(batch)
+            except Exception as e:
+                print(f"Unexpected error grading {[post.video_id for post in batch]}: {e}")
+                for post in batch:
+                    if post.video_id in self.in_flight:
+                        self.finish(post, None)
+            finally:
+                queue.task_done()
+
+    async def run(self, videos: Iterator[Dict]):
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self.worker(queue)) for _ in range(self.concurrency)]
+        try:
+            for batch in pack_batches(self.posts(videos)):
+                await queue.put(batch)
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def process_videos(api_key: str, url: str = GENERATE_URL, max_videos: Optional[int] = None,
+                         concurrency: int = MAX_CONCURRENT_REQUESTS, mock: bool = False):
+    """Grade every saved video that has no verdict in OUTPUT_PATH yet"""
+    os.makedirs(OUTPUT_PATH, exist_ok=True)
+
+    mock_runner = None
+    if mock:
+        mock_runner, url = await start_mock_model()
+        print(f"Using the mock model at {url}")
+
+    videos = pending_videos(VIDEOS_DIR, VIDEO_STORE_PATH)
+    if max_videos:
+        videos = (video for _, video in zip(range(max_videos), videos))
+
+    print(f"Grading videos with up to {concurrency} requests at a time, "
+          f"{MAX_BATCH_VIDEOS} videos per request...")
+    started = time.perf_counter()
+    try:
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            await Grader(session, url, api_key, concurrency).run(videos)
+    finally:
+        if mock_runner is not None:
+            await mock_runner.cleanup()
+
+    elapsed = time.perf_counter() - started
+    print("\nProcessing complete:")
+    print(f"Successfully processed: {stats.successful} videos in {stats.requests} requests")
+    print(f"Failed to process: {stats.failed} videos")
+    print(f"Skipped (already processed): {stats.skipped} videos")
+    print(f"Throughput: {stats.successful / elapsed * 3600 if elapsed else 0:.0f} videos/hour ({elapsed:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grade the scraped TikTok videos for electoral propaganda")
+    parser.add_argument('api_key', nargs='?', default='', help="Gemini API key")
+    parser.add_argument('--url', default=GENERATE_URL, help="generateContent endpoint")
+    parser.add_argument('--mock', action='store_true', help="Grade with a local mock model instead")
+    parser.add_argument('--limit', type=int, default=None, help="Videos to grade at most")
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help="Requests running at the same time")
+    args = parser.parse_args()
+
+    if not args.api_key and not args.mock:
+        parser.error("an API key is required unless --mock is used")
+
+    asyncio.run(process_videos(args.api_key, args.url, args.limit, args.concurrency, args.mock))
+
+
+if __name__ == "__main__":
+    main()
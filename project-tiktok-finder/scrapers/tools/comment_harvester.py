@@ -0,0 +1,74 @@
+import asyncio
+import itertools
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from tools.metrics import PipelineMetrics
+
+
+class CommentHarvester:
+    """
+    Background queue fetching the comments of the saved videos, separate from the
+    video crawl.
+
+    A few workers fetch at the same time, each video going to the next TikTokApi session
+    in turn, and the comments are added to the saved record once fetched.
+    """
+
+    def __init__(self, fetch: Callable[[str, int], Awaitable[List[Dict]]],
+                 store: Callable[[str, List[Dict]], bool], workers: int, num_sessions: int,
+                 metrics: Optional[PipelineMetrics] = None):
+        """
+        Args:
+            fetch: fetch_comments(video_id, session_index) coroutine
+            store: Adds the comments to the saved record of a video, False if it's missing
+            workers: Videos whose comments are fetched at the same time
+            num_sessions: TikTokApi sessions the videos are spread over
+        """
+        self.fetch = fetch
+        self.store = store
+        self.num_workers = workers
+        self.sessions = itertools.cycle(range(num_sessions))
+        self.metrics = metrics if metrics is not None else PipelineMetrics()
+
+        self.queue = asyncio.Queue()
+        self.queued: Set[str] = set()
+        self.workers = []
+
+    def start(self):
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+
+    def enqueue(self, video_id: str):
+        """Queue the comments of a saved video (never waits, so the crawl isn't slowed down)"""
+        if video_id in self.queued:
+            return
+        self.queued.add(video_id)
+        self.queue.put_nowait(video_id)
+        self.metrics.count('comments_queued')
+
+    async def _worker(self):
+        while True:
+            video_id = await self.queue.get()
+            try:
+                with self.metrics.timed('comments'):
+                    comments = await self.fetch(video_id, next(self.sessions))
+                if self.store(video_id, comments):
+                    self.metrics.count('comments_saved', len(comments))
+                else:
+                    self.metrics.count('comments_video_missing')
+            except Exception as e:
+                print(f"Error saving comments of video {video_id}: {e}")
+                self.metrics.count('comments_failed')
+            finally:
+                self.queue.task_done()
+
+    async def close(self, timeout: Optional[float] = None):
+        """Let the queued videos finish (up to timeout seconds), then stop the workers"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            self.metrics.count('comments_left_queued', self.queue.qsize())
+            print(f"Comments: stopping with {self.queue.qsize()} videos still queued")
+        finally:
+            for task in self.workers:
+                task.cancel()
+            await asyncio.gather(*self.workers, return_exceptions=True)
@@ -0,0 +1,218 @@
+import asyncio
+import itertools
+import os
+import re
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+from tools.metrics import PipelineMetrics
+
+FLAGGED_PRIORITY = 0
+DEFAULT_PRIORITY = 1
+
+DECISION_PATTERN = re.compile(r'<electoral-propaganda-decision>\s*TRUE\s*</electoral-propaganda-decision>')
+VERDICT_FILE_PATTERN = re.compile(r'video_(\d+)\.xml$')
+EXPIRY_MARGIN = 60  # Seconds before x-expires from which a signed media URL is treated as expired
+
+
+def load_flagged_ids(analysis_dir: str) -> Set[str]:
+    """IDs of the videos the AI verdicts (analysis_dir/video_<id>.xml) flagged as electoral propaganda"""
+    flagged = set()
+    if not os.path.isdir(analysis_dir):
+        return flagged
+
+    for filename in os.listdir(analysis_dir):
+        match = VERDICT_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        try:
+            with open(os.path.join(analysis_dir, filename), 'r', encoding='utf-8') as f:
+                if DECISION_PATTERN.search(f.read()):
+                    flagged.add(match.group(1))
+        except OSError:
+            continue
+    return flagged
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def url_expired(url: str) -> bool:
+    """Whether a signed TikTok CDN URL is past (or about to reach) its x-expires time"""
+    try:
+        expires = int(parse_qs(urlparse(url).query)['x-expires'][0])
+    except (KeyError, IndexError, ValueError):
+        return False
+    return expires < time.time() + EXPIRY_MARGIN
+
+
+class TokenBucket:
+    """Byte rate limit shared by every download holding it"""
+
+    def __init__(self, rate: float):
+        """
+        Args:
+            rate: Bytes per second
+        """
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def consume(self, amount: int):
+        """Take amount bytes, waiting (and holding back the other downloads) once the budget is spent"""
+        async with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            self.tokens -= amount
+            if self.tokens < 0:
+                await asyncio.sleep(-self.tokens / self.rate)
+
+
+class MediaDownloader:
+    """
+    Background queue of video (MP4) downloads, separate from the metadata crawl.
+
+    Videos the AI flagged are downloaded first. A few workers share one bandwidth cap,
+    and nothing more is downloaded once the media under videos_dir reach the disk quota:
+    each download reserves its size (the bytes already in its .part file, then the size
+    the server announces) before writing, so the workers can't overshoot it together.
+
+    Media URLs are signed and expire, so a video queued without a URL (saved in an earlier
+    run) or whose URL expired while queued gets a fresh one from resolve before downloading.
+    """
+
+    def __init__(self, download: Callable[..., Awaitable[bool]], videos_dir: str, filename: str,
+                 bytes_per_second: float, disk_quota: int, workers: int, flagged_ids: Set[str],
+                 headers: Optional[Dict[str, str]] = None, metrics: Optional[PipelineMetrics] = None,
+                 resolve: Optional[Callable[[str], Awaitable[Optional[str]]]] = None):
+        """
+        Args:
+            download: download_file(url, output_path, headers=..., limiter=..., reserve=...) coroutine
+            videos_dir: Folder with one sub-folder per video
+            filename: Name of the media file in the video folder
+            bytes_per_second: Bandwidth cap over all workers
+            disk_quota: Bytes of media files after which downloads stop
+            workers: Downloads running at the same time
+            flagged_ids: Videos to download first
+            headers: Request headers (referer, cookies) the media CDN requires
+            resolve: Coroutine returning a current media URL of a video, None if unavailable
+        """
+        self.download = download
+        self.videos_dir = videos_dir
+        self.filename = filename
+        self.bandwidth = TokenBucket(bytes_per_second)
+        self.disk_quota = disk_quota
+        self.num_workers = workers
+        self.flagged_ids = flagged_ids
+        self.headers = headers or {}
+        self.metrics = metrics if metrics is not None else PipelineMetrics()
+        self.resolve = resolve
+
+        self.queue = asyncio.PriorityQueue()
+        self.order = itertools.count()
+        self.queued: Set[str] = set()
+        self.disk_used = self._media_size()  # Bytes of the media and .part files not being downloaded
+        self.reserved: Dict[str, int] = {}  # Bytes each download in progress may take
+        self.workers = []
+
+    def _media_size(self) -> int:
+        """Bytes of the media files under videos_dir, partial downloads included"""
+        used = 0
+        if os.path.isdir(self.videos_dir):
+            with os.scandir(self.videos_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        path = os.path.join(entry.path, self.filename)
+                        used += _file_size(path) + _file_size(f"{path}.part")
+        return used
+
+    def _committed(self) -> int:
+        """Bytes on disk plus the bytes the downloads in progress reserved"""
+        return self.disk_used + sum(self.reserved.values())
+
+    def start(self):
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+
+    def enqueue(self, video_id: str, url: Optional[str] = None):
+        """
+        Queue the media of a video (never waits, so the crawl isn't slowed down), without
+        a url it's resolved when its turn comes
+        """
+        if video_id in self.queued or (not url and self.resolve is None):
+            return
+        self.queued.add(video_id)
+        priority = FLAGGED_PRIORITY if video_id in self.flagged_ids else DEFAULT_PRIORITY
+        self.queue.put_nowait((priority, next(self.order), video_id, url))
+        self.metrics.count('media_queued')
+
+    async def _worker(self):
+        while True:
+            _, _, video_id, url = await self.queue.get()
+            output_path = os.path.join(self.videos_dir, video_id, self.filename)
+            part_path = f"{output_path}.part"
+            try:
+                if os.path.exists(output_path):
+                    self.metrics.count('media_already_saved')
+                    continue
+
+                # The partial file counts as reserved by this download until it's done
+                self.reserved[video_id] = _file_size(part_path)
+                self.disk_used -= self.reserved[video_id]
+                if self._committed() >= self.disk_quota:
+                    self.metrics.count('media_skipped_disk_quota')
+                    continue
+                if not url or url_expired(url):
+                    url = await self.resolve(video_id) if self.resolve is not None else None
+                    if not url:
+                        self.metrics.count('media_url_unavailable')
+                        continue
+                    self.metrics.count('media_url_resolved')
+
+                over_quota = False
+
+                def reserve(size: int) -> bool:
+                    """Reserve the announced size of the media, False when it doesn't fit in the quota"""
+                    nonlocal over_quota
+                    self.reserved[video_id] = max(size, self.reserved[video_id])
+                    over_quota = self._committed() > self.disk_quota
+                    return not over_quota
+
+                with self.metrics.timed('media'):
+                    downloaded = await self.download(url, output_path, headers=self.headers, limiter=self.bandwidth,
+                                                     reserve=reserve)
+                if downloaded and os.path.exists(output_path):
+                    self.metrics.count('media_downloaded')
+                elif over_quota:
+                    self.metrics.count('media_skipped_disk_quota')
+                else:
+                    self.metrics.count('media_failed')
+            except Exception as e:
+                print(f"Error downloading media of video {video_id}: {e}")
+                self.metrics.count('media_failed')
+            finally:
+                if self.reserved.pop(video_id, None) is not None:
+                    self.disk_used += _file_size(output_path) + _file_size(part_path)
+                if not os.path.exists(output_path):
+                    # Not saved, it can be queued again
+                    self.queued.discard(video_id)
+                self.queue.task_done()
+
+    async def close(self, timeout: Optional[float] = None):
+        """Let the queued downloads finish (up to timeout seconds), then stop the workers"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            self.metrics.count('media_left_queued', self.queue.qsize())
+            print(f"Media downloads: stopping with {self.queue.qsize()} still queued")
+        finally:
+            for task in self.workers:
+                task.cancel()
+            await asyncio.gather(*self.workers, return_exceptions=True)
@@ -0,0 +1,71 @@
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not values:
+        return 0.0
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+class PipelineMetrics:
+    """Per-stage latencies, queue depth samples and event counters of the scraping pipeline"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.queue_depths: List[int] = []
+        self.counters: Counter = Counter()
+
+    def record(self, stage: str, seconds: float):
+        self.latencies[stage].append(seconds)
+
+    @contextmanager
+    def timed(self, stage: str):
+        """Time the body of the with block (awaits included) as one sample of the stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def count(self, event: str, amount: int = 1):
+        self.counters[event] += amount
+
+    def record_queue_depth(self, depth: int):
+        self.queue_depths.append(depth)
+
+    def summary(self) -> Dict[str, Dict]:
+        stages = {}
+        for stage, values in self.latencies.items():
+            values = sorted(values)
+            stages[stage] = {
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'p50': percentile(values, 0.5),
+                'p95': percentile(values, 0.95),
+                'max': values[-1]
+            }
+
+        depths = self.queue_depths
+        queue = {
+            'samples': len(depths),
+            'mean': sum(depths) / len(depths) if depths else 0.0,
+            'max': max(depths, default=0)
+        }
+        return {'stages': stages, 'queue_depth': queue, 'counters': dict(self.counters)}
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"\n{'Stage':<16} {'Count':>7} {'Mean s':>8} {'p50 s':>8} {'p95 s':>8} {'Max s':>8}")
+        for stage, stats in summary['stages'].items():
+            print(f"{stage:<16} {stats['count']:>7} {stats['mean']:>8.2f} {stats['p50']:>8.2f} "
+                  f"{stats['p95']:>8.2f} {stats['max']:>8.2f}")
+
+        queue = summary['queue_depth']
+        print(f"Video queue depth: mean {queue['mean']:.1f}, max {queue['max']} ({queue['samples']} samples)")
+
+        for event, amount in sorted(summary['counters'].items()):
+            print(f"{event}: {amount}")
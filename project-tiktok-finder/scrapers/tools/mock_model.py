@@ -0,0 +1,61 @@
+import asyncio
+import re
+import sys
+
+from aiohttp import web
+
+from tools.subtitle_index import normalize_text
+
+POST_PATTERN = re.compile(r'<post id="(\d+)">(.*?)</post>', re.DOTALL)
+MOCK_LATENCY = 0.5  # Seconds a mock generation takes
+MOCK_FLAG_WORDS = ('votati', 'votam', 'vot ')
+
+
+def mock_verdict(post_id: str, post: str) -> str:
+    decision = 'TRUE' if any(word in normalize_text(post) for word in MOCK_FLAG_WORDS) else 'FALSE'
+    message = f"Mock pentru videoclipul TikTok {post_id}." if decision == 'TRUE' else ''
+    return (
+        f"<output>\n<analysis>\nMock analysis of post {post_id}.\n</analysis>\n\n"
+        f"<conclusion>\n<post_id>{post_id}</post_id>\n"
+        f"<electoral-propaganda-analysis>\nMock.\n</electoral-propaganda-analysis>\n"
+        f"<electoral-propaganda-decision>{decision}</electoral-propaganda-decision>\n"
+        f"<electoral-propaganda-candidates>\n</electoral-propaganda-candidates>\n"
+        f"<responsible-party-or-group>INDEPENDENT</responsible-party-or-group>\n"
+        f"<message-for-police>\n{message}\n</message-for-police>\n"
+        f"</conclusion>\n</output>"
+    )
+
+
+def create_mock_app(latency: float = MOCK_LATENCY) -> web.Application:
+    """
+    Stand-in for the generateContent endpoint: answers every <post> of the request
+    with a verdict in the grader format, after `latency` seconds
+    """
+    async def generate(request: web.Request) -> web.Response:
+        payload = await request.json()
+        text = '\n'.join(
+            part.get('text', '') for content in payload.get('contents', []) for part in content.get('parts', [])
+        )
+        await asyncio.sleep(latency)
+        outputs = [mock_verdict(post_id, post) for post_id, post in POST_PATTERN.findall(text)]
+        return web.json_response({
+            'candidates': [{'content': {'role': 'model', 'parts': [{'text': '\n\n'.join(outputs)}]}}]
+        })
+
+    app = web.Application(client_max_size=64 * 1024 ** 2)
+    app.router.add_post('/generate', generate)
+    return app
+
+
+async def start_mock_model(port: int = 0, latency: float = MOCK_LATENCY):
+    """Serve the mock on localhost, returns (runner, generate URL)"""
+    runner = web.AppRunner(create_mock_app(latency))
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/generate"
+
+
+if __name__ == "__main__":
+    web.run_app(create_mock_app(), host='127.0.0.1', port=int(sys.argv[1]) if len(sys.argv) > 1 else 8080)
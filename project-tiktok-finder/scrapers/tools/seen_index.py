@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, Set
+
+SKIP = 'skip'
+REFRESH = 'refresh'
+NEW = 'new'
+
+
+class SeenVideoIndex:
+    """
+    IDs of the videos already saved under videos_dir, with when their stats were last
+    written, persisted to index_path and reconciled with the folder on load (folders
+    added or removed by hand are picked up). A folder missing one of required_files (a
+    download that failed or was interrupted) isn't saved, so the video is handled as new.
+
+    Videos kept in a VideoStore rather than as video_info.json are passed as stored_ids.
+
+    Also holds the IDs met during the current run, so a video listed under several
+    hashtags is only handled once. claim() checks and records in one step without
+    awaiting, so it is safe for the concurrent workers of a single event loop.
+    """
+
+    def __init__(self, index_path: str, videos_dir: str, refresh_after: float, stored_ids: Iterable[str] = (),
+                 required_files: Iterable[str] = ()):
+        """
+        Args:
+            index_path: JSON file of the index
+            videos_dir: Folder with one sub-folder (holding video_info.json) per saved video
+            refresh_after: Seconds after which the stats of a saved video are refreshed
+            stored_ids: IDs of the videos saved in a VideoStore
+            required_files: Files of the video folder a saved video must have
+        """
+        self.index_path = index_path
+        self.videos_dir = videos_dir
+        self.refresh_after = refresh_after
+        self.required_files = list(required_files)
+        self.videos: Dict[str, Dict[str, float]] = self._load(stored_ids)
+        self.claimed: Set[str] = set()
+        self.counts = {SKIP: 0, REFRESH: 0, NEW: 0, 'duplicate': 0}
+
+    def _load(self, stored_ids: Iterable[str]) -> Dict[str, Dict[str, float]]:
+        videos = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    videos = json.load(f)
+            except (OSError, ValueError):
+                videos = {}
+
+        on_disk = {}
+        if os.path.isdir(self.videos_dir):
+            with os.scandir(self.videos_dir) as entries:
+                for entry in entries:
+                    info_path = os.path.join(entry.path, 'video_info.json')
+                    if entry.is_dir() and os.path.exists(info_path) and self._is_complete(entry.path):
+                        on_disk[entry.name] = videos.get(entry.name) or {'stats_updated': os.path.getmtime(info_path)}
+
+        for video_id in stored_ids:
+            if video_id not in on_disk and self._is_complete(os.path.join(self.videos_dir, video_id)):
+                on_disk[video_id] = videos.get(video_id) or {'stats_updated': 0.0}
+        return on_disk
+
+    def _is_complete(self, video_dir: str) -> bool:
+        return all(os.path.exists(os.path.join(video_dir, name)) for name in self.required_files)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.videos, f)
+        os.replace(temp_path, self.index_path)
+
+    def claim(self, video_id: str) -> str:
+        """
+        What to do with a video met in the feed: NEW (not saved yet), REFRESH (saved,
+        stats older than refresh_after) or SKIP (saved with fresh stats, or already met
+        in this run)
+        """
+        if video_id in self.claimed:
+            self.counts['duplicate'] += 1
+            return SKIP
+        self.claimed.add(video_id)
+
+        seen = self.videos.get(video_id)
+        if seen is None:
+            action = NEW
+        elif time.time() - seen['stats_updated'] >= self.refresh_after:
+            action = REFRESH
+        else:
+            action = SKIP
+        self.counts[action] += 1
+        return action
+
+    def mark_saved(self, video_id: str):
+        """Record a video whose data was (re)written"""
+        self.videos[video_id] = {'stats_updated': time.time()}
+
+    def __len__(self) -> int:
+        return len(self.videos)
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self.videos
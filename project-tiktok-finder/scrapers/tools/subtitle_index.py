@@ -0,0 +1,428 @@
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from itertools import accumulate, repeat
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r'\w+')
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Romanian letters (both the comma and the cedilla forms) mapped straight to ASCII,
+# anything else accented goes through NFKD
+ROMANIAN_LETTERS = str.maketrans('ăâîșşțţĂÂÎȘŞȚŢ', 'aaissttAAISSTT')
+
+MAX_SEGMENTS = 10  # Posting segments kept before the smallest ones are merged
+MERGE_SEGMENTS = 10  # Segments merged at once
+SQLITE_MAX_VARIABLES = 900
+
+Cue = Tuple[int, int, str]  # (start ms, end ms, text)
+
+
+def _timestamp_ms(timestamp: str) -> int:
+    """'hh:mm:ss.ttt' or 'mm:ss.ttt' in milliseconds"""
+    seconds, _, millis = timestamp.partition('.')
+    total = 0
+    for part in seconds.split(':'):
+        total = total * 60 + int(part)
+    return total * 1000 + int(millis.ljust(3, '0')[:3] or 0)
+
+
+def parse_vtt(text: str) -> List[Cue]:
+    """
+    Cues of a WebVTT file, in file order. Cue identifiers, settings after the timing,
+    NOTE/STYLE blocks and inline tags are dropped, multi-line cues are joined.
+    """
+    cues = []
+    lines = text.splitlines()
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+        if '-->' not in line:
+            continue
+
+        start, _, end = line.partition('-->')
+        try:
+            start_ms = _timestamp_ms(start.strip())
+            end_ms = _timestamp_ms(end.split()[0])
+        except (ValueError, IndexError):
+            continue
+
+        cue_lines = []
+        while index < len(lines) and lines[index].strip():
+            cue_lines.append(lines[index].strip())
+            index += 1
+        cue_text = TAG_PATTERN.sub('', ' '.join(cue_lines)) if cue_lines else ''
+        if cue_text:
+            cues.append((start_ms, end_ms, cue_text))
+    return cues
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase without diacritics ('Călin Georgescu' -> 'calin georgescu')"""
+    text = text.translate(ROMANIAN_LETTERS).lower()
+    if not text.isascii():
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return text
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(normalize_text(text))
+
+
+def closest_window(times: List[List[int]]) -> Optional[Tuple[int, int]]:
+    """
+    Smallest time window holding one occurrence of every term.
+
+    Args:
+        times: Sorted occurrence times (ms) of each term
+
+    Returns:
+        (start ms, end ms) of the window, None if a term has no occurrence
+    """
+    if not times or not all(times):
+        return None
+
+    if len(times) == 2:
+        # Closest pair of two sorted lists, one merge pass
+        first, second = times
+        best = None
+        best_span = -1
+        i = j = 0
+        while i < len(first) and j < len(second):
+            a, b = first[i], second[j]
+            if a <= b:
+                span, low, high = b - a, a, b
+                i += 1
+            else:
+                span, low, high = a - b, b, a
+                j += 1
+            if best_span < 0 or span < best_span:
+                best, best_span = (low, high), span
+        return best
+
+    # Most terms occur once in a video: the window is then their span
+    if all(len(term_times) == 1 for term_times in times):
+        starts = [term_times[0] for term_times in times]
+        return min(starts), max(starts)
+
+    events = sorted((time, term) for term, term_times in enumerate(times) for time in term_times)
+    counts = [0] * len(times)
+    covered = 0
+    best = None
+    left = 0
+    for time, term in events:
+        counts[term] += 1
+        if counts[term] == 1:
+            covered += 1
+        while covered == len(times):
+            left_time, left_term = events[left]
+            if best is None or time - left_time < best[1] - best[0]:
+                best = (left_time, time)
+            counts[left_term] -= 1
+            if counts[left_term] == 0:
+                covered -= 1
+            left += 1
+    return best
+
+
+def _unpack(blob: bytes) -> array:
+    values = array('i')
+    values.frombytes(blob)
+    return values
+
+
+class TermPostings:
+    """Documents of one token and the cue start times in each, over all segments"""
+
+    __slots__ = ('positions', 'rows')
+
+    def __init__(self, rows: List[Tuple[bytes, bytes, bytes]], deleted: set):
+        self.rows = []
+        self.positions = {}
+        for docs, counts, times in rows:
+            docs, counts, times = _unpack(docs), _unpack(counts), _unpack(times)
+            row = len(self.rows)
+            self.rows.append((list(accumulate(counts, initial=0)), times))
+            self.positions.update(zip(docs, zip(repeat(row), range(len(docs)))))
+        for doc in deleted.intersection(self.positions):
+            del self.positions[doc]
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def times(self, doc: int) -> List[int]:
+        row, position = self.positions[doc]
+        offsets, times = self.rows[row]
+        return times[offsets[position]:offsets[position + 1]].tolist()
+
+
+class SubtitleIndex:
+    """
+    Inverted index over the subtitles.vtt of the scraped videos, in SQLite.
+
+    Postings are stored per (token, segment) as packed int32 arrays: the documents
+    holding the token, the number of cues in each and the cue start times, so a query
+    reads one row per segment of each term. Every update writes a new segment and the
+    smallest segments are merged once there are more than MAX_SEGMENTS. Tokens are
+    lowercase without diacritics. Files are indexed again only when their mtime or size
+    changed; the documents they replace are dropped from the postings at the next merge.
+
+    Updates may come from worker threads (asyncio.to_thread), they are serialized by a lock.
+    """
+
+    def __init__(self, db_path: str = os.path.join('videos', 'subtitles.sqlite')):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                doc INTEGER PRIMARY KEY AUTOINCREMENT,
+                video_id TEXT UNIQUE NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS deleted (
+                doc INTEGER PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS segments (
+                segment INTEGER PRIMARY KEY AUTOINCREMENT,
+                documents INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                token TEXT NOT NULL,
+                segment INTEGER NOT NULL,
+                docs BLOB NOT NULL,
+                counts BLOB NOT NULL,
+                times BLOB NOT NULL,
+                PRIMARY KEY (token, segment)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_segment ON postings (segment);
+        """)
+        self._create_cues()
+
+    def _create_cues(self):
+        """Cues keyed by their position in the file, as several can share the same timing"""
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(cues)')}
+        with self.conn:
+            if columns and 'cue' not in columns:
+                # Cues were keyed by their timing and overwrote each other, every file is indexed again
+                self.conn.execute('INSERT OR IGNORE INTO deleted SELECT doc FROM documents')
+                self.conn.execute('DELETE FROM documents')
+                self.conn.execute('DROP TABLE cues')
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS cues (
+                    video_id TEXT NOT NULL,
+                    cue INTEGER NOT NULL,
+                    start_ms INTEGER NOT NULL,
+                    end_ms INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (video_id, cue)
+                ) WITHOUT ROWID
+            """)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _is_indexed(self, video_id: str, stat: os.stat_result) -> bool:
+        row = self.conn.execute('SELECT mtime_ns, size FROM documents WHERE video_id = ?', (video_id,)).fetchone()
+        return row is not None and row[0] == stat.st_mtime_ns and row[1] == stat.st_size
+
+    def _remove(self, video_id: str):
+        row = self.conn.execute('SELECT doc FROM documents WHERE video_id = ?', (video_id,)).fetchone()
+        if row is None:
+            return
+        self.conn.execute('INSERT OR IGNORE INTO deleted VALUES (?)', row)
+        self.conn.execute('DELETE FROM documents WHERE doc = ?', row)
+        self.conn.execute('DELETE FROM cues WHERE video_id = ?', (video_id,))
+
+    def _index_files(self, files: List[Tuple[str, str, os.stat_result]]):
+        """Index (video_id, vtt path, stat) files into a new segment, in the current transaction"""
+        postings: Dict[str, Tuple[array, array, array]] = {}
+        for video_id, vtt_path, stat in files:
+            with open(vtt_path, 'r', encoding='utf-8', errors='replace') as f:
+                cues = parse_vtt(f.read())
+
+            self._remove(video_id)
+            doc = self.conn.execute('INSERT INTO documents (video_id, mtime_ns, size) VALUES (?, ?, ?)',
+                                    (video_id, stat.st_mtime_ns, stat.st_size)).lastrowid
+            self.conn.executemany('INSERT INTO cues (video_id, cue, start_ms, end_ms, text) VALUES (?, ?, ?, ?, ?)',
+                                  ((video_id, cue, start_ms, end_ms, text)
+                                   for cue, (start_ms, end_ms, text) in enumerate(cues)))
+
+            token_times: Dict[str, List[int]] = {}
+            for start_ms, _, text in cues:
+                for token in set(tokenize(text)):
+                    token_times.setdefault(token, []).append(start_ms)
+            for token, times in token_times.items():
+                docs, counts, all_times = postings.setdefault(token, (array('i'), array('i'), array('i')))
+                docs.append(doc)
+                counts.append(len(times))
+                all_times.extend(sorted(times))
+
+        if not files:
+            return
+        segment = self.conn.execute('INSERT INTO segments (documents) VALUES (?)', (len(files),)).lastrowid
+        self.conn.executemany('INSERT INTO postings VALUES (?, ?, ?, ?, ?)', (
+            (token, segment, docs.tobytes(), counts.tobytes(), times.tobytes())
+            for token, (docs, counts, times) in postings.items()
+        ))
+        self._merge_segments()
+
+    def _merge_segments(self, force: bool = False):
+        """Merge the MERGE_SEGMENTS smallest segments (all of them when forced) into one"""
+        segments = self.conn.execute('SELECT segment, documents FROM segments ORDER BY documents, segment').fetchall()
+        if len(segments) <= (1 if force else MAX_SEGMENTS):
+            return
+        merged = sorted(segment for segment, _ in (segments if force else segments[:MERGE_SEGMENTS]))
+        deleted = {doc for (doc,) in self.conn.execute('SELECT doc FROM deleted')}
+
+        placeholders = ', '.join('?' * len(merged))
+        postings: Dict[str, Tuple[array, array, array]] = {}
+        # Doc ids only grow, so going through the segments in order keeps each token's docs sorted
+        for token, docs, counts, times in self.conn.execute(
+                f'SELECT token, docs, counts, times FROM postings WHERE segment IN ({placeholders}) '
+                f'ORDER BY segment', merged):
+            docs, counts, times = _unpack(docs), _unpack(counts), _unpack(times)
+            merged_docs, merged_counts, merged_times = postings.setdefault(token, (array('i'), array('i'), array('i')))
+            if deleted.isdisjoint(docs):
+                merged_docs.extend(docs)
+                merged_counts.extend(counts)
+                merged_times.extend(times)
+                continue
+            offset = 0
+            for doc, count in zip(docs, counts):
+                if doc not in deleted:
+                    merged_docs.append(doc)
+                    merged_counts.append(count)
+                    merged_times.extend(times[offset:offset + count])
+                offset += count
+
+        live = self.conn.execute(
+            f'SELECT SUM(documents) FROM segments WHERE segment IN ({placeholders})', merged).fetchone()[0]
+        self.conn.execute(f'DELETE FROM postings WHERE segment IN ({placeholders})', merged)
+        self.conn.execute(f'DELETE FROM segments WHERE segment IN ({placeholders})', merged)
+        segment = self.conn.execute('INSERT INTO segments (documents) VALUES (?)', (live,)).lastrowid
+        self.conn.executemany('INSERT INTO postings VALUES (?, ?, ?, ?, ?)', (
+            (token, segment, docs.tobytes(), counts.tobytes(), times.tobytes())
+            for token, (docs, counts, times) in postings.items() if docs
+        ))
+        if force:
+            self.conn.execute('DELETE FROM deleted')
+
+    def add_video(self, video_id: str, vtt_path: str) -> bool:
+        """Index (or re-index) one video's subtitles, returns False when they were up to date"""
+        stat = os.stat(vtt_path)
+        with self.lock:
+            if self._is_indexed(video_id, stat):
+                return False
+            with self.conn:
+                self._index_files([(video_id, vtt_path, stat)])
+        return True
+
+    def update(self, videos_dir: str, filename: str = 'subtitles.vtt') -> Tuple[int, int]:
+        """
+        Bring the index in line with videos_dir/<id>/subtitles.vtt: new or changed files
+        are indexed (into one new segment), videos whose file is gone are dropped.
+
+        Returns:
+            (videos indexed, videos removed)
+        """
+        indexed = {video_id: (mtime_ns, size) for video_id, mtime_ns, size
+                   in self.conn.execute('SELECT video_id, mtime_ns, size FROM documents')}
+        changed = []
+        present = set()
+        with os.scandir(videos_dir) as entries:
+            for entry in entries:
+                vtt_path = os.path.join(entry.path, filename)
+                if not entry.is_dir() or not os.path.exists(vtt_path):
+                    continue
+                present.add(entry.name)
+                stat = os.stat(vtt_path)
+                if indexed.get(entry.name) != (stat.st_mtime_ns, stat.st_size):
+                    changed.append((entry.name, vtt_path, stat))
+
+        removed = [video_id for video_id in indexed if video_id not in present]
+        with self.lock, self.conn:
+            for video_id in removed:
+                self._remove(video_id)
+            self._index_files(changed)
+        return len(changed), len(removed)
+
+    def optimize(self):
+        """Merge every segment into one and drop the deleted documents from the postings"""
+        with self.lock, self.conn:
+            self._merge_segments(force=True)
+
+    def _term_postings(self, token: str, deleted: set) -> TermPostings:
+        rows = self.conn.execute('SELECT docs, counts, times FROM postings WHERE token = ?', (token,)).fetchall()
+        return TermPostings(rows, deleted)
+
+    def search(self, terms: Iterable[str], within_seconds: Optional[float] = None,
+               limit: Optional[int] = None) -> List[Dict]:
+        """
+        Videos whose subtitles contain every term, optionally all within within_seconds
+        of each other (cue start times).
+
+        Returns:
+            Dicts with video_id, start_ms and end_ms of the closest window of the terms,
+            closest first
+        """
+        tokens = list(dict.fromkeys(token for term in terms for token in tokenize(term)))
+        if not tokens:
+            return []
+
+        deleted = {doc for (doc,) in self.conn.execute('SELECT doc FROM deleted')}
+        # Rarest term first, so the candidate set only shrinks
+        postings = sorted((self._term_postings(token, deleted) for token in tokens), key=len)
+        candidates = set(postings[0].positions)
+        for term_postings in postings[1:]:
+            candidates.intersection_update(term_postings.positions)
+            if not candidates:
+                return []
+
+        windows = {}
+        for doc in candidates:
+            window = closest_window([term_postings.times(doc) for term_postings in postings])
+            if window is None:
+                continue
+            if within_seconds is not None and window[1] - window[0] > within_seconds * 1000:
+                continue
+            windows[doc] = window
+
+        video_ids = self._video_ids(windows)
+        results = [{'video_id': video_ids[doc], 'start_ms': start_ms, 'end_ms': end_ms}
+                   for doc, (start_ms, end_ms) in windows.items()]
+        results.sort(key=lambda result: (result['end_ms'] - result['start_ms'], result['video_id']))
+        return results[:limit] if limit is not None else results
+
+    def _video_ids(self, docs: Iterable[int]) -> Dict[int, str]:
+        docs = list(docs)
+        video_ids = {}
+        for start in range(0, len(docs), SQLITE_MAX_VARIABLES):
+            chunk = docs[start:start + SQLITE_MAX_VARIABLES]
+            video_ids.update(self.conn.execute(
+                f"SELECT doc, video_id FROM documents WHERE doc IN ({', '.join('?' * len(chunk))})", chunk))
+        return video_ids
+
+    def cues(self, video_id: str, start_ms: int = 0, end_ms: Optional[int] = None) -> List[Cue]:
+        """Cues of a video starting between start_ms and end_ms"""
+        cursor = self.conn.execute(
+            'SELECT start_ms, end_ms, text FROM cues WHERE video_id = ? AND start_ms BETWEEN ? AND ? '
+            'ORDER BY start_ms, cue',
+            (video_id, start_ms, end_ms if end_ms is not None else 2 ** 62)
+        )
+        return cursor.fetchall()
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
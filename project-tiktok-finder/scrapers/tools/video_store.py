@@ -0,0 +1,435 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Codec of the raw blobs, recorded per row so a store stays readable if it changes
+CODEC = 'zstd' if zstandard is not None else 'zlib'
+COMPRESSION_LEVEL = 9
+SQLITE_MAX_VARIABLES = 900
+
+VIDEO_COLUMNS = ('id, author_id, music_id, create_time, description, duration, play_count, digg_count, '
+                 'comment_count, share_count, collect_count, updated, codec, raw, comments_raw, '
+                 'author_changes, music_changes')
+RECORD_COLUMNS = 'id, author_id, music_id, codec, raw, comments_raw, author_changes, music_changes'
+AUTHOR_COLUMNS = 'id, unique_id, nickname, signature, verified, follower_count, heart_count, video_count, codec, raw'
+MUSIC_COLUMNS = 'id, title, author_name, original, codec, raw'
+COMMENT_ROW_COLUMNS = 'cid, video_id, user_id, user_name, text, create_time, digg_count, position'
+
+
+def compress(data: bytes, codec: str = CODEC) -> bytes:
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(data)
+    return zlib.compress(data, COMPRESSION_LEVEL)
+
+
+def decompress(blob: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("This store holds zstd blobs, install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _pack(value: Any, codec: str = CODEC) -> bytes:
+    return compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), codec)
+
+
+def _unpack(blob: bytes, codec: str) -> Any:
+    return json.loads(decompress(blob, codec))
+
+
+def _changes(shared: Dict, value: Dict) -> Optional[Dict]:
+    """The fields of value that differ from shared, None if value lacks some of them"""
+    if not shared.keys() <= value.keys():
+        return None
+    return {key: item for key, item in value.items() if key not in shared or shared[key] != item}
+
+
+# Comment fields kept in the comments columns (when of the column's type), and out of the blob
+COMMENT_COLUMNS = {'cid': str, 'text': str, 'create_time': int, 'digg_count': int}
+COMMENT_USER_COLUMNS = {'uid': str, 'unique_id': str}
+
+
+def _in_column(columns: Dict[str, type], key: str, value: Any) -> bool:
+    return key in columns and type(value) is columns[key]
+
+
+def _strip_comment(comment: Dict) -> Dict:
+    """The fields of a comment that aren't in its comments row"""
+    rest = {key: value for key, value in comment.items() if not _in_column(COMMENT_COLUMNS, key, value)}
+    if isinstance(comment.get('user'), dict):
+        rest['user'] = {key: value for key, value in comment['user'].items()
+                        if not _in_column(COMMENT_USER_COLUMNS, key, value)}
+    return rest
+
+
+def _rebuild_comment(row: tuple, rest: Dict) -> Dict:
+    """A comment from its comments row (cid, user_id, user_name, text, create_time, digg_count) and rest"""
+    cid, user_id, user_name, text, create_time, digg_count = row
+    comment = {key: value for key, value in
+               (('cid', cid), ('text', text), ('create_time', create_time), ('digg_count', digg_count))
+               if value is not None}
+    comment.update(rest)
+    if isinstance(rest.get('user'), dict):
+        user = {key: value for key, value in (('uid', user_id), ('unique_id', user_name)) if value is not None}
+        user.update(rest['user'])
+        comment['user'] = user
+    return comment
+
+
+def _update_columns(columns: str) -> str:
+    """SET clause refreshing the columns of a shared row, its first stored copy (codec, raw) kept"""
+    names = [name.strip() for name in columns.split(',')]
+    updates = [f'{name} = excluded.{name}' for name in names if name not in ('id', 'codec', 'raw')]
+    updates += [f'{name} = CASE WHEN raw IS NULL THEN excluded.{name} ELSE {name} END' for name in ('codec', 'raw')]
+    return ', '.join(updates)
+
+
+class VideoStore:
+    """
+    SQLite store of the scraped TikTok videos, in place of one pretty printed
+    video_info.json per video.
+
+    Each piece of a record is stored once: the first copy of an author and of a music
+    is kept in their tables, shared by their videos (each video keeping only the fields
+    its own copy changed), comments are rows of the comments table (their other fields
+    compressed together per video), and the rest of the record, authorStats included, is
+    a compact, compressed JSON blob. get() puts the record back together as scraped.
+    """
+
+    def __init__(self, db_path: str = os.path.join('videos', 'videos.sqlite')):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS videos (
+                id TEXT PRIMARY KEY,
+                author_id TEXT,
+                music_id TEXT,
+                create_time INTEGER,
+                description TEXT,
+                duration INTEGER,
+                play_count INTEGER,
+                digg_count INTEGER,
+                comment_count INTEGER,
+                share_count INTEGER,
+                collect_count INTEGER,
+                updated REAL NOT NULL,
+                codec TEXT NOT NULL,
+                raw BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS authors (
+                id TEXT PRIMARY KEY,
+                unique_id TEXT,
+                nickname TEXT,
+                signature TEXT,
+                verified INTEGER,
+                follower_count INTEGER,
+                heart_count INTEGER,
+                video_count INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS music (
+                id TEXT PRIMARY KEY,
+                title TEXT,
+                author_name TEXT,
+                original INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS comments (
+                cid TEXT PRIMARY KEY,
+                video_id TEXT NOT NULL,
+                user_id TEXT,
+                user_name TEXT,
+                text TEXT,
+                create_time INTEGER,
+                digg_count INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS videos_author ON videos (author_id);
+            CREATE INDEX IF NOT EXISTS videos_create_time ON videos (create_time);
+            CREATE INDEX IF NOT EXISTS comments_video ON comments (video_id);
+            CREATE INDEX IF NOT EXISTS authors_unique_id ON authors (unique_id);
+        """)
+        self._add_columns({
+            'videos': ['comments_raw BLOB', 'author_changes BLOB', 'music_changes BLOB'],
+            'authors': ['codec TEXT', 'raw BLOB'],
+            'music': ['codec TEXT', 'raw BLOB'],
+            'comments': ['position INTEGER'],
+        })
+
+    def _add_columns(self, columns: Dict[str, List[str]]):
+        """Columns added since the first stores were created (their old rows keep the full record in raw)"""
+        with self.conn:
+            for table, definitions in columns.items():
+                existing = {row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')}
+                for definition in definitions:
+                    if definition.split()[0] not in existing:
+                        self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {definition}')
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _shared(self, table: str, ids: Iterable[str]) -> Dict[str, Dict]:
+        """The stored copies of these authors or music, by id"""
+        return {row_id: _unpack(raw, codec) for row_id, codec, raw in self._select_in(
+            f'SELECT id, codec, raw FROM {table} WHERE raw IS NOT NULL AND id IN ({{}})', list(set(ids)))}
+
+    def _write(self, videos: Iterable[Dict]):
+        videos = list(videos)
+        shared_authors = {author_id: shared['author'] for author_id, shared in self._shared(
+            'authors', ((video_data.get('author') or {}).get('id') for video_data in videos)).items()}
+        shared_music = self._shared('music', ((video_data.get('music') or {}).get('id') for video_data in videos))
+
+        video_rows, author_rows, music_rows, comment_rows, video_ids = [], [], [], [], []
+        for video_data in videos:
+            video_id = str(video_data['id'])
+            video_ids.append((video_id,))
+            record = dict(video_data)
+            stats = record.get('stats') or {}
+
+            # Only the first copy of an author or music is stored (the latest counters in its columns)
+            author = record.get('author') or {}
+            author_changes = None
+            if author.get('id'):
+                author_stats = record.get('authorStats') or {}
+                new_author = author['id'] not in shared_authors
+                author_rows.append((
+                    author['id'], author.get('uniqueId'), author.get('nickname'), author.get('signature'),
+                    int(bool(author.get('verified'))), _int(author_stats.get('followerCount')),
+                    _int(author_stats.get('heartCount')), _int(author_stats.get('videoCount')),
+                    CODEC, _pack({'author': author}) if new_author else None
+                ))
+                changes = _changes(shared_authors.setdefault(author['id'], author), author)
+                if changes is not None:
+                    del record['author']
+                    author_changes = _pack(changes) if changes else None
+
+            music = record.get('music') or {}
+            music_changes = None
+            if music.get('id'):
+                new_music = music['id'] not in shared_music
+                music_rows.append((music['id'], music.get('title'), music.get('authorName'),
+                                   int(bool(music.get('original'))), CODEC, _pack(music) if new_music else None))
+                changes = _changes(shared_music.setdefault(music['id'], music), music)
+                if changes is not None:
+                    del record['music']
+                    music_changes = _pack(changes) if changes else None
+
+            comments_raw = None
+            if 'comments' in record:
+                rests = []
+                cids = set()
+                for position, comment in enumerate(record.pop('comments') or []):
+                    cid = comment.get('cid')
+                    if not isinstance(cid, str) or not cid or cid in cids:
+                        # Not a comments row, kept whole
+                        rests.append(comment)
+                        continue
+                    cids.add(cid)
+                    user = comment.get('user') or {}
+                    comment_rows.append((
+                        cid, video_id, user.get('uid'), user.get('unique_id'), comment.get('text'),
+                        _int(comment.get('create_time')), _int(comment.get('digg_count')), position
+                    ))
+                    rests.append(_strip_comment(comment))
+                comments_raw = _pack(rests)
+
+            video_rows.append((
+                video_id,
+                author.get('id'),
+                music.get('id'),
+                _int(record.get('createTime')),
+                record.get('desc'),
+                _int((record.get('video') or {}).get('duration')),
+                _int(stats.get('playCount')),
+                _int(stats.get('diggCount')),
+                _int(stats.get('commentCount')),
+                _int(stats.get('shareCount')),
+                _int(stats.get('collectCount')),
+                time.time(),
+                CODEC,
+                _pack(record),
+                comments_raw,
+                author_changes,
+                music_changes
+            ))
+
+        with self.conn:
+            self.conn.executemany('DELETE FROM comments WHERE video_id = ?', video_ids)
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO videos ({VIDEO_COLUMNS}) VALUES ({', '.join('?' * 17)})", video_rows)
+            self.conn.executemany(
+                f"INSERT INTO authors ({AUTHOR_COLUMNS}) VALUES ({', '.join('?' * 10)}) "
+                f"ON CONFLICT(id) DO UPDATE SET {_update_columns(AUTHOR_COLUMNS)}", author_rows)
+            self.conn.executemany(
+                f"INSERT INTO music ({MUSIC_COLUMNS}) VALUES ({', '.join('?' * 6)}) "
+                f"ON CONFLICT(id) DO UPDATE SET {_update_columns(MUSIC_COLUMNS)}", music_rows)
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO comments ({COMMENT_ROW_COLUMNS}) VALUES ({', '.join('?' * 8)})", comment_rows)
+
+    def put(self, video_data: Dict):
+        """Store (or replace) a video_info record, comments included"""
+        self._write([video_data])
+
+    def put_many(self, videos: Iterable[Dict]):
+        """Store many records in one transaction"""
+        self._write(videos)
+
+    def _select_in(self, sql: str, values: List[str]) -> Iterator[tuple]:
+        """Rows of sql (with an IN ({}) placeholder) for values, chunked under the variable limit"""
+        for start in range(0, len(values), SQLITE_MAX_VARIABLES):
+            chunk = values[start:start + SQLITE_MAX_VARIABLES]
+            yield from self.conn.execute(sql.format(', '.join('?' * len(chunk))), chunk)
+
+    def _records(self, rows: List[tuple]) -> Dict[str, Dict]:
+        """Complete records of videos rows (RECORD_COLUMNS)"""
+        authors = self._shared('authors', (row[1] for row in rows if row[1]))
+        music = self._shared('music', (row[2] for row in rows if row[2]))
+
+        comment_rows: Dict[str, Dict[int, tuple]] = {}
+        with_comments = [row[0] for row in rows if row[5] is not None]
+        for video_id, position, *comment in self._select_in(
+                'SELECT video_id, position, cid, user_id, user_name, text, create_time, digg_count '
+                'FROM comments WHERE video_id IN ({})', with_comments):
+            comment_rows.setdefault(video_id, {})[position] = tuple(comment)
+
+        records = {}
+        for video_id, author_id, music_id, codec, raw, comments_raw, author_changes, music_changes in rows:
+            record = _unpack(raw, codec)
+            if 'author' not in record and author_id in authors:
+                shared = authors[author_id]
+                record['author'] = {**shared['author'], **(_unpack(author_changes, codec) if author_changes else {})}
+                if 'authorStats' not in record and 'authorStats' in shared:
+                    # Stored while the authorStats were kept with the author
+                    record['authorStats'] = shared['authorStats']
+            if 'music' not in record and music_id in music:
+                record['music'] = {**music[music_id], **(_unpack(music_changes, codec) if music_changes else {})}
+            if comments_raw is not None:
+                by_position = comment_rows.get(video_id, {})
+                record['comments'] = [
+                    _rebuild_comment(by_position[position], rest) if position in by_position else rest
+                    for position, rest in enumerate(_unpack(comments_raw, codec))
+                ]
+            records[video_id] = record
+        return records
+
+    def get(self, video_id: str) -> Optional[Dict]:
+        """The complete video_info record, as it was scraped, or None"""
+        return self.get_many([video_id]).get(str(video_id))
+
+    def get_many(self, video_ids: Iterable[str]) -> Dict[str, Dict]:
+        video_ids = list(dict.fromkeys(str(video_id) for video_id in video_ids))
+        rows = list(self._select_in(
+            f'SELECT {RECORD_COLUMNS} FROM videos WHERE id IN ({{}})', video_ids))
+        return self._records(rows)
+
+    def iter_videos(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Every stored record, oldest video first"""
+        cursor = self.conn.execute(
+            f'SELECT {RECORD_COLUMNS} FROM videos ORDER BY create_time')
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            records = self._records(rows)
+            for row in rows:
+                yield records[row[0]]
+
+    def video_ids(self) -> List[str]:
+        return [row[0] for row in self.conn.execute('SELECT id FROM videos')]
+
+    def comments(self, video_id: str) -> List[Dict]:
+        cursor = self.conn.execute(
+            'SELECT cid, user_id, user_name, text, create_time, digg_count FROM comments '
+            'WHERE video_id = ? ORDER BY create_time', (str(video_id),))
+        fields = ['cid', 'user_id', 'user_name', 'text', 'create_time', 'digg_count']
+        return [dict(zip(fields, row)) for row in cursor]
+
+    def query(self, sql: str, params: Iterable = ()) -> List[Dict]:
+        """Rows of any read query over the tables, as dicts"""
+        cursor = self.conn.execute(sql, tuple(params))
+        fields = [column[0] for column in cursor.description]
+        return [dict(zip(fields, row)) for row in cursor]
+
+    def import_folder(self, videos_dir: str, batch_size: int = 200) -> int:
+        """Store every videos_dir/<id>/video_info.json (the JSON files are left in place)"""
+        batch = []
+        imported = 0
+        for name in sorted(os.listdir(videos_dir)):
+            info_path = os.path.join(videos_dir, name, 'video_info.json')
+            if not os.path.exists(info_path):
+                continue
+            with open(info_path, 'r', encoding='utf-8') as f:
+                batch.append(json.load(f))
+            if len(batch) >= batch_size:
+                self.put_many(batch)
+                imported += len(batch)
+                batch = []
+        if batch:
+            self.put_many(batch)
+            imported += len(batch)
+        return imported
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM videos').fetchone()[0]
+
+    def __contains__(self, video_id: str) -> bool:
+        return self.conn.execute('SELECT 1 FROM videos WHERE id = ?', (str(video_id),)).fetchone() is not None
+
+
+def import_videos(videos_dir: str, db_path: str):
+    """Import the video_info.json files into the store, comparing disk use and read time"""
+    json_size = sum(
+        os.path.getsize(os.path.join(videos_dir, name, 'video_info.json'))
+        for name in os.listdir(videos_dir)
+        if os.path.exists(os.path.join(videos_dir, name, 'video_info.json'))
+    )
+
+    started = time.perf_counter()
+    with VideoStore(db_path) as store:
+        imported = store.import_folder(videos_dir)
+        store.conn.execute('VACUUM')
+        elapsed = time.perf_counter() - started
+        print(f"Imported {imported} videos into {db_path} ({CODEC}) in {elapsed:.2f}s")
+
+        started = time.perf_counter()
+        videos = sum(1 for _ in store.iter_videos())
+        read_store = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for name in os.listdir(videos_dir):
+        info_path = os.path.join(videos_dir, name, 'video_info.json')
+        if os.path.exists(info_path):
+            with open(info_path, 'r', encoding='utf-8') as f:
+                json.load(f)
+    read_json = time.perf_counter() - started
+
+    db_size = os.path.getsize(db_path)
+    print(f"video_info.json files: {json_size / 1e6:.1f}MB, store: {db_size / 1e6:.1f}MB "
+          f"({json_size / db_size:.1f}x smaller)")
+    print(f"Reading all {videos} records: JSON files {read_json:.2f}s, store {read_store:.2f}s")
+
+
+if __name__ == "__main__":
+    import_videos(sys.argv[1] if len(sys.argv) > 1 else 'videos',
+                  sys.argv[2] if len(sys.argv) > 2 else os.path.join('videos', 'videos.sqlite'))